@@ -0,0 +1,403 @@
+import getopt, sys, csv, glob, os, random, time
+try:
+   from .Project import probe_sequence, has_space, read_file
+except ImportError:
+   from Project import probe_sequence, has_space, read_file
+"""
+This program benchmarks the quality and speed of different hash functions.
+
+Every combination of hash function, collision scheme, bucket size, load
+factor and key set is inserted into an empty table, and the results are
+written to a CSV file with one row per combination.
+
+It can be run from the command line by providing arguments:
+-f, --hash_functions: comma separated hash functions to test (modulus,
+                      multiplicative, fibonacci, tabulation)
+-a, --multipliers: comma separated constants A, 0<A<1, for the
+                   multiplicative hash
+-m, --moduli: comma separated moduli for the modulus hash, as Project.py's
+              -m (default: the largest prime <= the number of buckets)
+-c, --collision_schemes: comma separated collision schemes (linear,
+                         quadratic, double, chaining)
+-b, --bucket_sizes: comma separated bucket sizes
+-l, --load_factors: comma separated load factors
+-t, --table_size: the number of slots in the table (default 120)
+-i, --input: a key file to test, may be repeated (default Test Cases/*.txt)
+-r, --repeats: the number of timed runs per combination, the fastest is kept
+-s, --seed: the seed for the synthetic keys and tabulation tables
+-o, --output: the filename of the output CSV
+
+Key sets are the input files plus three synthetic sets sized to each load
+factor: uniform random 5 digit keys, sequential keys and, for each modulus
+m in use, keys spaced m apart ("stride<m>"), which all share one home bucket
+under the modulus hash with that m. A file key set is cut
+to the number of keys the load factor calls for, and skipped if it is too
+short.
+"""
+
+FIELDS = ["hash_function", "collision_scheme", "bucket_size", "load_factor", \
+          "key_set", "num_keys", "keys_per_sec", "avg_probe_length", \
+          "max_probe_length", "primary_collisions", "secondary_collisions", \
+          "num_comparisons", "num_not_inserted"]
+
+def largest_prime(size):
+   """Finds the default modulus for a table, the largest prime <= size
+
+   A prime modulus spreads keys that share a factor with the table size
+
+   Args:
+      size (int): the number of buckets in the table
+
+   Returns:
+      modulus (int): the largest prime <= size (size itself if size <= 2)
+   """
+   modulus = size
+   while modulus > 2 and any(modulus % d == 0 \
+                             for d in range(2, int(modulus**.5) + 1)):
+      modulus -= 1
+   return modulus
+
+def modulus_hash(modulus):
+   """Creates the division hash, h(k) = k mod m
+
+   Args:
+      modulus (int): m, at most the number of buckets in the table
+
+   Returns:
+      (function): maps a key to its home bucket
+   """
+   return lambda key: key % modulus
+
+def multiplicative_hash(size, a):
+   """Creates the multiplication hash, h(k) = floor(M(kA mod 1))
+
+   Args:
+      size (int): the number of buckets in the table, M
+      a (float): the constant A, 0<A<1 (Project.py uses 0.623)
+
+   Returns:
+      (function): maps a key to its home bucket
+   """
+   return lambda key: int(size * ((key * a) % 1))
+
+def fibonacci_hash(size):
+   """Creates the Fibonacci hash
+
+   Multiplicative hashing with A = 2^64 / golden ratio, done in integer
+   arithmetic: h(k) = ((k * A) mod 2^64) * M / 2^64
+
+   Args:
+      size (int): the number of buckets in the table, M
+
+   Returns:
+      (function): maps a key to its home bucket
+   """
+   a = 11400714819323198485
+   mask = (1 << 64) - 1
+   return lambda key: (((key * a) & mask) * size) >> 64
+
+def tabulation_hash(size, rng):
+   """Creates a simple tabulation hash
+
+   The key is split into four bytes, each byte looks up a random 32 bit
+   value in its own table, and the lookups are XORed together. The 32 bit
+   result is scaled down to M buckets.
+
+   Args:
+      size (int): the number of buckets in the table, M
+      rng (Random): the generator used to fill the tables
+
+   Returns:
+      (function): maps a key to its home bucket
+   """
+   tables = [[rng.getrandbits(32) for _ in range(256)] for _ in range(4)]
+   def h(key):
+      x = tables[0][key & 255] ^ tables[1][(key >> 8) & 255] ^ \
+         tables[2][(key >> 16) & 255] ^ tables[3][(key >> 24) & 255]
+      return (x * size) >> 32
+   return h
+
+def make_hash_functions(names, multipliers, moduli, size, seed):
+   """Builds the hash functions to benchmark
+
+   Args:
+      names (string list): the hash functions to build
+      multipliers (float list): the constants to use for multiplicative
+      moduli (int list): the moduli to use for modulus
+      size (int): the number of buckets in the table
+      seed (int): the seed for the tabulation tables
+
+   Returns:
+      functions (list): (name, function) pairs
+   """
+   functions = []
+   for name in names:
+      match name:
+         case "modulus":
+            for m in moduli:
+               functions.append((name + "(m=" + str(m) + ")", \
+                                 modulus_hash(m)))
+         case "multiplicative":
+            for a in multipliers:
+               functions.append((name + "(A=" + str(a) + ")", \
+                                 multiplicative_hash(size, a)))
+         case "fibonacci":
+            functions.append((name, fibonacci_hash(size)))
+         case "tabulation":
+            functions.append((name, tabulation_hash(size, \
+                                                    random.Random(seed))))
+         case _:
+            raise Exception("hash function must be one of: modulus, \
+multiplicative, fibonacci, tabulation")
+   return functions
+
+def synthetic_keys(num_keys, rng, strides):
+   """Generates the synthetic key sets
+
+   Args:
+      num_keys (int): the number of keys in each set
+      rng (Random): the generator used for the random set
+      strides (int list): the spacing of each strided set. Keys spaced m
+         apart all hash to one bucket under the modulus hash with m
+
+   Returns:
+      key_sets (list): (name, int list) pairs
+   """
+   start = rng.randrange(10000)
+   return [("random", [rng.randrange(100000) for _ in range(num_keys)]), \
+           ("sequential", list(range(start, start + num_keys)))] + \
+          [("stride" + str(stride), [start + stride * i \
+                                     for i in range(num_keys)]) \
+           for stride in strides]
+
+def insert_all(keys, hash_function, size, bucket_size, collision_scheme):
+   """Inserts keys into an empty table, measuring the probes each one takes
+
+   Follows the same rules as hash() in Project.py, but with any hash
+   function and a probe length (buckets examined) recorded for every key
+
+   Args:
+      keys (int list): the keys to insert
+      hash_function (function): maps a key to its home bucket
+      size (int): the number of buckets in the table
+      bucket_size (int): the bucket size of the hash table
+      collision_scheme (string): the collision resolution method to use, must
+         be one of: linear, quadratic, double, chaining
+
+   Returns:
+      elapsed (float): the time taken to insert every key
+      probe_lengths (int list): the buckets examined for each inserted key
+      primary_collisions (int): number of primary collisions
+      secondary_collisions (int): number of secondary collisions
+      num_comparisons (int): number of comparisons performed
+      not_inserted (int): number of keys not inserted
+   """
+   table = [[list() for j in range(bucket_size)] for i in range(size)]
+   probe_lengths = []
+   primary_collisions = 0
+   secondary_collisions = 0
+   num_comparisons = 0
+   not_inserted = 0
+
+   begin = time.perf_counter()
+   for key in keys:
+      index = hash_function(key)
+      loc = has_space(table[index])
+      if loc != -1 or collision_scheme == "chaining":
+         table[index][loc].append(key)
+         probe_lengths.append(1)
+         continue
+      primary_collisions += 1
+      num_comparisons += 1
+      probes = 1
+      secondary_collision = 0
+      for i in probe_sequence(key, index, size, collision_scheme):
+         probes += 1
+         loc = has_space(table[i])
+         if loc != -1:
+            table[i][loc].append(key)
+            probe_lengths.append(probes)
+            break
+         secondary_collision = 1
+         num_comparisons += 1
+      else:
+         not_inserted += 1
+         secondary_collision = 1
+      secondary_collisions += secondary_collision
+   elapsed = time.perf_counter() - begin
+
+   return elapsed, probe_lengths, primary_collisions, secondary_collisions, \
+      num_comparisons, not_inserted
+
+def benchmark(hash_functions, multipliers, collision_schemes, bucket_sizes, \
+              load_factors, key_files, table_size, repeats, seed, \
+              moduli=None):
+   """Runs every combination of the given parameters
+
+   Args:
+      hash_functions (string list): the hash functions to test
+      multipliers (float list): the constants to use for multiplicative
+      collision_schemes (string list): the collision schemes to test
+      bucket_sizes (int list): the bucket sizes to test
+      load_factors (float list): the load factors to test
+      key_files (string list): key files to use alongside synthetic keys
+      table_size (int): the number of slots in the table
+      repeats (int): the number of timed runs per combination
+      seed (int): the seed for the synthetic keys and tabulation tables
+      moduli (int list): the moduli to use for modulus, each at most
+         table_size / bucket_size. The largest prime <= the number of
+         buckets if None
+
+   Returns:
+      rows (list): one dictionary of FIELDS per combination
+   """
+   files = [(os.path.basename(f), read_file(f)) for f in key_files]
+   rows = []
+   for bucket_size in bucket_sizes:
+      size = table_size // bucket_size
+      moduli_used = moduli or [largest_prime(size)]
+      functions = make_hash_functions(hash_functions, multipliers, \
+                                      moduli_used, size, seed)
+      for load_factor in load_factors:
+         num_keys = int(load_factor * size * bucket_size)
+         key_sets = synthetic_keys(num_keys, random.Random(seed), \
+                                   moduli_used) + \
+            [(name, keys[:num_keys]) for name, keys in files \
+             if len(keys) >= num_keys]
+         for name, function in functions:
+            for collision_scheme in collision_schemes:
+               for key_set, keys in key_sets:
+                  # keep the fastest run, the stats are identical each time
+                  results = min((insert_all(keys, function, size, \
+                                 bucket_size, collision_scheme) \
+                                 for _ in range(repeats)), \
+                                key=lambda result: result[0])
+                  elapsed, probe_lengths, pc, sc, nc, ni = results
+                  rows.append({
+                     "hash_function": name,
+                     "collision_scheme": collision_scheme,
+                     "bucket_size": bucket_size,
+                     "load_factor": load_factor,
+                     "key_set": key_set,
+                     "num_keys": len(keys),
+                     "keys_per_sec": len(keys) / elapsed if elapsed else 0,
+                     "avg_probe_length": sum(probe_lengths) / \
+                        len(probe_lengths) if probe_lengths else 0,
+                     "max_probe_length": max(probe_lengths, default=0),
+                     "primary_collisions": pc,
+                     "secondary_collisions": sc,
+                     "num_comparisons": nc,
+                     "num_not_inserted": ni})
+   return rows
+
+def write_csv(filename, rows):
+   """Writes the benchmark results to a CSV file
+
+   Args:
+      filename (string): the file to write to (overwrites the file)
+      rows (list): one dictionary of FIELDS per combination
+   """
+   with open(filename, 'w', newline="", encoding='UTF8') as f:
+      writer = csv.DictWriter(f, fieldnames=FIELDS)
+      writer.writeheader()
+      writer.writerows(rows)
+
+def main(argv=None):
+   """Command line entry point, see the module docstring for the arguments
+
+   Args:
+      argv (string list): the command line arguments, sys.argv[1:] if None
+   """
+   argument_list = sys.argv[1:] if argv is None else argv
+   options = "hf:a:m:c:b:l:t:i:r:s:o:"
+   long_options = ["help", "hash_functions=", "multipliers=", "moduli=", \
+                   "collision_schemes=", "bucket_sizes=", "load_factors=", \
+                   "table_size=", "input=", "repeats=", "seed=", "output="]
+
+   hash_functions = ["modulus", "multiplicative", "fibonacci", "tabulation"]
+   multipliers = [.623]
+   moduli = None
+   collision_schemes = ["linear", "quadratic", "double", "chaining"]
+   bucket_sizes = [1, 3]
+   load_factors = [.25, .5, .75, .9, 1.0]
+   table_size = 120
+   key_files = []
+   repeats = 3
+   seed = 0
+   output_filename = "benchmark.csv"
+
+   # parse command line arguments
+   try:
+      arguments, values = getopt.getopt(argument_list, options, long_options)
+      help_string = "-f, --hash_functions: comma separated hash functions \
+(modulus, multiplicative, fibonacci, tabulation)\n\
+-a, --multipliers: comma separated constants A for the multiplicative hash\n\
+-m, --moduli: comma separated moduli for the modulus hash (default: the \
+largest prime <= the number of buckets)\n\
+-c, --collision_schemes: comma separated collision schemes \
+(linear, quadratic, double, chaining)\n\
+-b, --bucket_sizes: comma separated bucket sizes\n\
+-l, --load_factors: comma separated load factors\n\
+-t, --table_size: the number of slots in the table (default 120)\n\
+-i, --input: a key file to test, may be repeated (default Test Cases/*.txt)\n\
+-r, --repeats: the number of timed runs per combination\n\
+-s, --seed: the seed for synthetic keys and tabulation tables\n\
+-o, --output: the filename of the output CSV (default benchmark.csv)"
+      for current_argument, current_value in arguments:
+         if current_argument in ("-h", "--help"):
+            print(help_string)
+            return
+         elif current_argument in ("-f", "--hash_functions"):
+            hash_functions = current_value.split(",")
+         elif current_argument in ("-a", "--multipliers"):
+            multipliers = [float(a) for a in current_value.split(",")]
+         elif current_argument in ("-m", "--moduli"):
+            moduli = [int(m) for m in current_value.split(",")]
+         elif current_argument in ("-c", "--collision_schemes"):
+            collision_schemes = current_value.split(",")
+         elif current_argument in ("-b", "--bucket_sizes"):
+            bucket_sizes = [int(b) for b in current_value.split(",")]
+         elif current_argument in ("-l", "--load_factors"):
+            load_factors = [float(l) for l in current_value.split(",")]
+         elif current_argument in ("-t", "--table_size"):
+            table_size = int(current_value)
+         elif current_argument in ("-i", "--input"):
+            key_files.append(current_value)
+         elif current_argument in ("-r", "--repeats"):
+            repeats = int(current_value)
+         elif current_argument in ("-s", "--seed"):
+            seed = int(current_value)
+         elif current_argument in ("-o", "--output"):
+            output_filename = current_value
+   except getopt.error as err:
+      print(str(err))
+
+   # Exception handling
+   for collision_scheme in collision_schemes:
+      if collision_scheme not in ("linear", "quadratic", "double", \
+                                  "chaining"):
+         raise Exception("collision_scheme must be one of: linear, \
+quadratic, double, chaining")
+   for a in multipliers:
+      if not 0 < a < 1:
+         raise Exception("multipliers must be 0 < A < 1")
+   for bucket_size in bucket_sizes:
+      if bucket_size < 1 or bucket_size > table_size:
+         raise Exception("bucket_size must be 1 <= bucket_size <= table_size")
+   if repeats < 1:
+      raise Exception("repeats must be at least 1")
+   if moduli is not None:
+      for m in moduli:
+         if m < 1 or m > table_size // max(bucket_sizes):
+            raise Exception("moduli must be 1 <= m <= table_size/bucket_size")
+   if not key_files:
+      key_files = sorted(glob.glob(os.path.join(os.path.dirname( \
+         os.path.abspath(__file__)), "Test Cases", "*.txt")))
+
+   rows = benchmark(hash_functions, multipliers, collision_schemes, \
+                    bucket_sizes, load_factors, key_files, table_size, \
+                    repeats, seed, moduli)
+   write_csv(output_filename, rows)
+
+if __name__ == "__main__":
+   main()
@@ -1,4 +1,9 @@
-import getopt, sys
+import getopt, sys, io, os, shutil, tempfile
+from math import gcd
+if not __package__:
+   # run as a script, Profiler.py is in the repo root one level up
+   sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from Profiler import Profiler
 """
 This program is used to assess various hashing strategies.
 
@@ -8,28 +13,44 @@ It can be run from the command line by providing arguments:
 -o, --output: the filename of the output file
 -m, --modulus: the modulus you wish to use
 -b, --bucket_size: the bucket size you wish to use
--c, --collision_scheme: the collision scheme (linear, quadratic, or chaining)
+-c, --collision_scheme: the collision scheme (linear, quadratic, double, or 
+                        chaining)
 -i, --input: the input filename
+-n, --numpy: a flag to hash with the vectorized NumPy path (bulk_hash) and 
+             report the bucket occupancy histogram
+-r, --rows: the most hash table rows to print, sampled evenly for huge 
+            tables (0 omits the table)
+--profile: the JSON file to write phase timings, peak memory and counters to
+           (see Profiler.py), --cprofile adds a cProfile dump and 
+           --trace_memory adds tracemalloc's peak (which slows the run)
 
 The personal hash funtion that I elected to use is multiplication and is 
 derived as follows:
 h(k) = floor(M(kA mod 1))
 where M is the size of the hash table (120), k is the key value, and A is a 
 constant, 0<A<1, which I chose to be 0.623. 
+
+Collisions are resolved by probing the whole table (see probe_sequence), so 
+keys are only left uninserted when every bucket is full. The double scheme 
+uses a second hash of the key, 1 + (k // M) mod (M - 1), as its step size.
 """
-def hash(input, modulus, bucket_size, collision_scheme, personal_hash):
+def hash(input, modulus, bucket_size, collision_scheme, personal_hash, \
+         not_inserted=None, profiler=None):
    """ Hash table calculation
    
    Depending on the arguments provided, calculates the hash table of input 
       keys
 
    Args:
-      input (int list): a list of the keys to be hashed
+      input (int iterable): the keys to be hashed, read once in order
       modulus (int): the modulus to perform hashing with
       bucket_size (int): the bucket size of the hash table
       collision_scheme (string): the collision resolution method to use, must
-         be one of: linear, quadratic, chaining
+         be one of: linear, quadratic, double, chaining
       personal_hash (boolean): flag to use personal_hash (1) or not (0)
+      not_inserted (KeySpool): where to collect keys that cannot be 
+         inserted, a new list if not given
+      profiler (Profiler): charges collision handling to its "probe" phase
 
    Returns:
       table: the resulting hash table
@@ -38,6 +59,8 @@ def hash(input, modulus, bucket_size, collision_scheme, personal_hash):
          stats)
       num_comparisons (int): number of comparisons performed (used for stats)
       not_inserted (int list): list of keys not inserted (used for stats)
+      num_items (int): number of keys stored in the table, counted as they
+         are inserted (used for the load factor)
    """
    # Creates empty table of buckets properly sized according to static table
    #  size of 120
@@ -45,37 +68,290 @@ def hash(input, modulus, bucket_size, collision_scheme, personal_hash):
             for i in range(int(120/bucket_size)) ]
    primary_collisions = 0
    secondary_collisions = 0
-   not_inserted = list()
+   if not_inserted is None:
+      not_inserted = list()
+   if profiler is None:
+      profiler = Profiler(enabled = False)
    num_comparisons = 0
+   num_items = 0
 
    # For every key we have, we compute the hash
    for key in input:
       # perform personal hash if flag is set
-      if personal_hash:
-         index = int(len(table) * ((key * .623) % 1))
-      else:
-         index = key % modulus
+      index = home_index(key, modulus, len(table), personal_hash)
       # if the key hashes to an empty spot first, store it
       loc = has_space(table[index])
       if loc != -1 or collision_scheme == "chaining":
          table[index][loc].append(key)
+         num_items += 1
       # otherwise, handle the collision and store it there
       else:
+         with profiler.phase("probe"):
+            index, sc, nc = handle_collision(table, key, modulus, \
+                                             collision_scheme, personal_hash)
+         # if we cannot store it, keep track of it
+         if index == -1:
+            not_inserted.append(key)
+         else:
+            loc = has_space(table[index])
+            table[index][loc].append(key)
+            num_items += 1
+         primary_collisions += 1
+         secondary_collisions += sc
+         num_comparisons += nc
+
+   return table, primary_collisions, secondary_collisions, num_comparisons, \
+      not_inserted, num_items
+
+def bulk_hash(input, modulus, bucket_size, collision_scheme, personal_hash, \
+              profiler=None):
+   """Vectorized hash table calculation for large key sets
+   
+   Computes every home index at once with NumPy and derives the bucket 
+   distribution with bincount. The first bucket_size keys (in input order) 
+   that hash to a bucket are stored there directly; only the keys that 
+   overflow their home bucket go through handle_collision. Because resident
+   keys are placed before any overflow is probed, the probing stats can be
+   lower than those of hash(), which interleaves the two. Chaining produces
+   the same table as hash(). Once the table is full, the remaining overflow
+   is rejected in bulk: each key would be compared with every bucket.
+
+   Args:
+      input (int list): a list of the keys to be hashed
+      modulus (int): the modulus to perform hashing with
+      bucket_size (int): the bucket size of the hash table
+      collision_scheme (string): the collision resolution method to use, must
+         be one of: linear, quadratic, double, chaining
+      personal_hash (boolean): flag to use personal_hash (1) or not (0)
+      profiler (Profiler): charges probing the overflow to its "probe" phase
+
+   Returns:
+      table: the resulting hash table
+      primary_collsions (int): number of keys that overflowed their home 
+         bucket (used for stats)
+      secondary_collisions (int): number of secondary collisions (used for
+         stats)
+      num_comparisons (int): number of comparisons performed (used for stats)
+      not_inserted (int list): list of keys not inserted (used for stats)
+      num_items (int): number of keys stored in the table
+      home_counts (int array): number of keys hashing to each bucket
+      occupancy (int array): occupancy[n] is the number of buckets that n 
+         keys hash to
+   """
+   try:
+      import numpy as np
+   except ImportError:
+      raise Exception("bulk hashing requires numpy (pip install numpy)")
+
+   table = [ [list() for j in range(bucket_size)] \
+            for i in range(int(120/bucket_size)) ]
+   size = len(table)
+   keys = np.asarray(input, dtype=np.int64)
+
+   # home index of every key, matching home_index() element-wise
+   if personal_hash:
+      home = (size * np.mod(keys * .623, 1)).astype(np.int64)
+   else:
+      # a negative modulus gives negative indices, which hash() reaches 
+      #  through negative list indexing, i.e. index + size
+      home = (keys % modulus) % size
+   home_counts = np.bincount(home, minlength=size)
+   occupancy = np.bincount(home_counts)
+
+   # rank of each key among the keys sharing its home bucket, in input order
+   order = np.argsort(home, kind="stable")
+   starts = np.cumsum(home_counts) - home_counts
+   rank = np.empty_like(order)
+   rank[order] = np.arange(len(keys)) - starts[home[order]]
+
+   primary_collisions = 0
+   secondary_collisions = 0
+   not_inserted = list()
+   num_comparisons = 0
+
+   # keys that fit in their home bucket (every key, when chaining), placed
+   #  a bucket at a time from their groups in the stable sort
+   fits = rank < bucket_size
+   if collision_scheme == "chaining":
+      fits[:] = True
+   sorted_keys = keys[order].tolist()
+   for index in np.flatnonzero(home_counts).tolist():
+      group = sorted_keys[starts[index]:starts[index] + home_counts[index]]
+      for loc in range(min(len(group), bucket_size - 1)):
+         table[index][loc].append(group[loc])
+      # the last slot holds the chain
+      if collision_scheme == "chaining":
+         table[index][-1].extend(group[bucket_size - 1:])
+      else:
+         table[index][-1].extend(group[bucket_size - 1:bucket_size])
+   num_items = int(fits.sum())
+
+   # only the overflowing keys are probed, in input order
+   if profiler is None:
+      profiler = Profiler(enabled = False)
+   overflow = keys[~fits].tolist()
+   capacity = size * bucket_size
+   with profiler.phase("probe"):
+      for count, key in enumerate(overflow):
+         if num_items == capacity:
+            # full: every remaining key probes all size buckets and fails
+            rest = overflow[count:]
+            not_inserted.extend(rest)
+            primary_collisions += len(rest)
+            secondary_collisions += len(rest)
+            num_comparisons += len(rest) * size
+            break
          index, sc, nc = handle_collision(table, key, modulus, \
                                           collision_scheme, personal_hash)
-         # if we cannot store it, keep track of it
          if index == -1:
             not_inserted.append(key)
          else:
             loc = has_space(table[index])
             table[index][loc].append(key)
+            num_items += 1
          primary_collisions += 1
          secondary_collisions += sc
          num_comparisons += nc
-         
 
    return table, primary_collisions, secondary_collisions, num_comparisons, \
-      not_inserted
+      not_inserted, num_items, home_counts, occupancy
+
+def run(keys, modulus, bucket_size, collision_scheme, personal_hash=0, \
+        bulk=0, max_rows=None, profiler=None):
+   """Hashes keys that are already in memory and collects the results
+   
+   The programmatic equivalent of running this file from the command line,
+   for callers that want to hash many key sets from one process
+   
+   Args:
+      keys (int iterable): the keys to be hashed
+      modulus (int): the modulus to perform hashing with
+      bucket_size (int): the bucket size of the hash table
+      collision_scheme (string): the collision resolution method to use, must
+         be one of: linear, quadratic, double, chaining
+      personal_hash (boolean): flag to use personal_hash (1) or not (0)
+      bulk (boolean): flag to use bulk_hash (1, requires numpy) or hash (0)
+      max_rows (int): the most table rows to put in the report, all if None
+      profiler (Profiler): records the compute, probe and format phases
+   
+   Returns:
+      results (dict): the outputs of hash (table, primary_collisions, 
+         secondary_collisions, num_comparisons, not_inserted, num_items), 
+         the load_factor, and the report the command line would write. With
+         bulk, also home_counts and occupancy
+   """
+   check_arguments(modulus, bucket_size, collision_scheme)
+   if profiler is None:
+      profiler = Profiler(enabled = False)
+   keys = list(keys)
+   results = {}
+   with profiler.phase("compute"):
+      if bulk:
+         table, primary_collisions, secondary_collisions, num_comparisons, \
+            not_inserted, num_items, home_counts, occupancy = bulk_hash( \
+               keys, modulus, bucket_size, collision_scheme, personal_hash, \
+               profiler)
+         results["home_counts"] = home_counts
+         results["occupancy"] = occupancy
+      else:
+         table, primary_collisions, secondary_collisions, num_comparisons, \
+            not_inserted, num_items = hash(keys, modulus, bucket_size, \
+               collision_scheme, personal_hash, profiler = profiler)
+   results.update({"table": table,
+                   "primary_collisions": primary_collisions,
+                   "secondary_collisions": secondary_collisions,
+                   "num_comparisons": num_comparisons,
+                   "not_inserted": not_inserted,
+                   "num_items": num_items,
+                   "load_factor": num_items / 120})
+   profiler.count("keys", len(keys))
+   profiler.count("primary_collisions", primary_collisions)
+   profiler.count("num_comparisons", num_comparisons)
+   with profiler.phase("format"):
+      distribution = histogram_string(home_counts, occupancy) if bulk else ""
+      results["report"] = input_string(keys) + distribution + \
+         stats_string(table, bucket_size, collision_scheme, \
+                      primary_collisions, secondary_collisions, \
+                      num_comparisons, not_inserted, num_items) + \
+         pretty_print(table, bucket_size, collision_scheme, max_rows)
+   return results
+
+def check_arguments(modulus, bucket_size, collision_scheme):
+   """Checks that a hashing configuration is valid
+   
+   Args:
+      modulus (int): the modulus to perform hashing with
+      bucket_size (int): the bucket size of the hash table
+      collision_scheme (string): the collision resolution method to use
+   
+   Raises:
+      Exception: if any argument is out of range
+   """
+   if collision_scheme not in ("linear", "quadratic", "double", "chaining"):
+      raise Exception("collision_scheme must be one of: linear, quadratic, \
+double, chaining")
+   if not isinstance(modulus, int) or modulus == 0:
+      raise Exception("modulus must be an integer not equal to 0")
+   if not isinstance(bucket_size, int) or bucket_size < 1 or bucket_size > 120:
+      raise Exception("bucket_size must be an integer 1 <= bucket_size <= 120")
+   if modulus > 120/bucket_size:
+      raise Exception("modulus must be < 120/bucket_size")
+
+def home_index(key, modulus, size, personal_hash):
+   """Computes the first index a key hashes to
+   
+   Args:
+      key (int): the key being hashed
+      modulus (int): the modulus to perform hashing with
+      size (int): the number of buckets in the table
+      personal_hash (boolean): flag to use personal_hash (1) or not (0)
+   
+   Returns:
+      index (int): the home bucket of the key
+   """
+   if personal_hash:
+      return int(size * ((key * .623) % 1))
+   return key % modulus
+
+def probe_sequence(key, home, size, collision_scheme):
+   """Generates the buckets to try after a key collides at its home bucket
+   
+   Every scheme visits each of the other size - 1 buckets exactly once, so a
+   key is only rejected when the table is truly full:
+      linear: home + i (mod size)
+      quadratic: home + i(i + 1)/2 over the next power of two >= size. 
+         Triangular numbers cover every residue of a power of two, and 
+         indices that fall outside the table are skipped
+      double: home + i * step (mod size), where step comes from a second 
+         hash of the key and is made coprime to size
+   
+   Args:
+      key (int): the key that had the collision
+      home (int): the bucket the key originally hashed to
+      size (int): the number of buckets in the table
+      collision_scheme (string): one of: linear, quadratic, double
+   
+   Yields:
+      i (int): the next bucket to check
+   """
+   match collision_scheme:
+      case "linear":
+         for index in range(1, size):
+            yield (home + index) % size
+      case "quadratic":
+         power = 1
+         while power < size:
+            power *= 2
+         for index in range(1, power):
+            i = (home + index * (index + 1) // 2) % power
+            if i < size:
+               yield i
+      case "double":
+         step = 1 + (key // size) % max(size - 1, 1)
+         while gcd(step, size) != 1:
+            step += 1
+         for index in range(1, size):
+            yield (home + index * step) % size
 
 def handle_collision(table, key, modulus, collision_scheme, personal_hash):
    """Handles collisions of hash table
@@ -88,71 +364,34 @@ def handle_collision(table, key, modulus, collision_scheme, personal_hash):
       key (int): the key that had the collision
       modulus (int): the modulus we are hashing with
       collision_scheme (string): the collision resolution method to use, must
-         be one of: linear, quadratic, chaining
+         be one of: linear, quadratic, double, chaining
       personal_hash (boolean): flag to use personal_hash (1) or not (0)
    
    Returns:
       i (int): the index we can hash the given key into, safely
-      primary_collsions (int): number of primary collisions (used for stats)
       secondary_collisions (int): number of secondary collisions (used for
-         stats)"""
-   index = 1
-   counter = 0
+         stats)
+      num_comparisons (int): number of comparisons performed (used for stats)
+   """
+   # we still use the personal hash if asked, but the updates happen as 
+   #  specified by collision_scheme
+   i = home_index(key, modulus, len(table), personal_hash)
+
+   # since we can chain, we return the same index
+   if collision_scheme == "chaining":
+      return i, 0, 1
+
    secondary_collision = 0
    num_comparisons = 1
+   # continue until we find a space
+   for i in probe_sequence(key, i, len(table), collision_scheme):
+      if has_space(table[i]) != -1:
+         return i, secondary_collision, num_comparisons
+      secondary_collision = 1
+      num_comparisons += 1
 
-   # select proper collision method, as specified
-   match collision_scheme:
-      case "linear":
-         # we still use the personal hash if asked, but the updates happen as 
-         #  specified by collision_scheme
-         if personal_hash:
-            i = int(len(table) * ((key * .623) % 1))
-         else:
-            i = (key + index) % modulus
-         # continue until we find a space
-         while has_space(table[i]) == -1:
-            secondary_collision = 1
-            num_comparisons += 1
-            index += 1
-            counter += 1
-            
-            # if we have tried every spot, return unsuccessful attempt
-            if counter >= len(table):
-               return -1, 1, num_comparisons
-            
-            # update key as specified
-            if personal_hash:
-               i = int(len(table) * ((key * .623) % 1))
-            else:
-               i = (key + index) % modulus
-      case "quadratic":
-         c1 = 1
-         c2 = 2
-         if personal_hash:
-            i = int(len(table) * ((key * .623) % 1))
-         else:
-            i = int((key + c1 * index + c2 * index**2) % modulus)
-         # continue until we find a space
-         while has_space(table[i]) == -1:
-            secondary_collision = 1
-            num_comparisons += 1
-            index += 1
-            counter += 1
-
-            # if we tried every possible spot, return unsuccessful attempt
-            if counter >= len(table):
-               return -1, 1, num_comparisons
-            
-            # update key as specified
-            if personal_hash:
-               i = int(len(table) * ((key * .623) % 1))
-            else:
-               i = int((key + c1 * index + c2 * index**2) % modulus)
-      case "chaining":
-         # since we can chain, we return the same index
-         index = 0
-   return i, secondary_collision, num_comparisons
+   # we have tried every spot, return unsuccessful attempt
+   return -1, 1, num_comparisons
 
 def has_space(arr):
    """Checks whether there is space in a bucket
@@ -173,7 +412,7 @@ def has_space(arr):
       i += 1
    return -1
 
-def pretty_print(table, bucket_size, collision_scheme):
+def pretty_print(table, bucket_size, collision_scheme, max_rows=None):
    """Formats hash table for printing
    
    Formats the hash table in proper format for inspecting
@@ -182,86 +421,61 @@ def pretty_print(table, bucket_size, collision_scheme):
       table (int array): the table to be printed
       bucket_size (int): the number of elements allowed in each bucket
       collision_scheme (string): the collision resolution method to use, must
-         be one of: linear, quadratic, chaining
+         be one of: linear, quadratic, double, chaining
+      max_rows (int): the most rows to print (see write_table), all if None
          
    Returns:
       table_string (string): the properly formatted table for printing
    """
-   table_string = ""
-   counter = 0
-   row_num = 1
-   # print each bucket
-   for bucket in table:
-      if counter == 0:
-         table_string += str(row_num) + " "
-      for elem in bucket:
-         # if there is an element present, print it
-         if elem:
-            # handle chaining
-            if collision_scheme == "chaining":
-               for e in elem:
-                  table_string += str(e).zfill(5) + "->"
-               table_string = table_string[:-2]
-            else:
-               table_string += str(elem[0]).zfill(5)
-         # if no element, add filler
-         else:
-            table_string += "-----"
-         table_string += " "
-      counter += 1
-      # handle new lines based on bucket size
-      if bucket_size == 1 and counter == 5:
-         table_string += "\n"
-         counter = 0
-         row_num += 1
-      elif bucket_size != 1:
-         table_string += "\n"
-         row_num += 1
-         counter = 0
-   return table_string
+   f = io.StringIO()
+   write_table(f, table, bucket_size, collision_scheme, max_rows)
+   return f.getvalue()
 
 def stats_string(table, bucket_size, collision_scheme, primary_collisions, \
-                 secondary_collisions, num_comparisons, not_inserted):
+                 secondary_collisions, num_comparisons, not_inserted, \
+                 num_items=None):
    """Formats the stats we collected for printing
    
    Args:
       table (int array): the table to be printed
       bucket_size (int): the number of elements allowed in each bucket
       collision_scheme (string): the collision resolution method to use, must
-         be one of: linear, quadratic, chaining
+         be one of: linear, quadratic, double, chaining
       primary_collsions (int): number of primary collisions (used for stats)
       secondary_collisions (int): number of secondary collisions (used for
          stats)
       num_comparisons (int): number of comparisons performed (used for stats)
       not_inserted (int list): list of keys not inserted (used for stats)
+      num_items (int): number of keys in the table, as returned by hash().
+         Counted from the table if not given
       
    Returns:
       stats_string (string): the properly formatted statistical information
    """
-   stats_string = "Hash Table size: 120 \n"
-   stats_string += "Bucket Size: " + str(bucket_size) + "\n"
-   stats_string += "Collision Scheme: " + collision_scheme + "\n"
-   stats_string += "Primary Collisions: " + str(primary_collisions) + "\n"
-   stats_string += "Secondary Collisions: " + str(secondary_collisions) + "\n"
-   stats_string += "Number of comparisions: " + str(num_comparisons) + "\n"
-   stats_string += "Number not inserted: " + str(len(not_inserted)) + "\n"
-   stats_string += "Keys not inserted: " + str(not_inserted) + "\n"
-   num_items = 0
-   # calculate load
-   for bucket in table:
-      for elem in bucket:
-         if len(elem) > 1:
-            for e in elem:
-               num_items += 1
-         elif len(elem) == 1:
-            num_items += 1
-   load_factor = num_items / 120
-
-   stats_string += "Load Factor: " + str(load_factor) + "\n\n"
-   stats_string += "============================= \n\n"
-   stats_string += "Hash Table\n"
+   f = io.StringIO()
+   write_stats(f, table, bucket_size, collision_scheme, primary_collisions, \
+               secondary_collisions, num_comparisons, not_inserted, num_items)
+   return f.getvalue()
 
-   return stats_string
+def histogram_string(home_counts, occupancy):
+   """Formats the bucket distribution from bulk_hash for printing
+   
+   Args:
+      home_counts (int array): number of keys hashing to each bucket
+      occupancy (int array): occupancy[n] is the number of buckets that n 
+         keys hash to
+   
+   Returns:
+      histogram_string (string): the properly formatted distribution
+   """
+   histogram_string = "Max keys hashing to one bucket: " + \
+      str(int(home_counts.max())) + "\n"
+   histogram_string += "Bucket Occupancy (keys: buckets)\n"
+   for n, count in enumerate(occupancy.tolist()):
+      if count:
+         histogram_string += str(n) + ": " + str(count) + "\n"
+   histogram_string += "\n============================= \n\n"
+   return histogram_string
 
 def input_string(input):
    """Formats input keys for printing in output file
@@ -272,18 +486,235 @@ def input_string(input):
    Returns:
       input_string (string): input keys formatted for printing
    """
-   input_string = "Input keys size: " + str(len(input)) + "\n"
-   input_string += "Table size: 120\n"
-   input_string += "Input keys: \n"
-   counter = 1
+   listing = KeySpool(io.StringIO(), " ", 5)
    for i in input:
-      input_string += str(i) + " "
-      if counter == 5:
-         counter = 0
-         input_string += "\n"
-      counter += 1
-   input_string += "\n=====================\n"
-   return input_string
+      listing.append(i)
+   f = io.StringIO()
+   write_input(f, listing)
+   return f.getvalue()
+
+class KeySpool:
+   """Collects keys in a file as they arrive instead of in a list
+   
+   Used by the streaming report so that neither the input keys nor the keys
+   that could not be inserted have to be held in memory. Keys are written 
+   already formatted, either per_line to a line (the input key listing) or 
+   as a list ([a, b, ...], the keys not inserted).
+   """
+   def __init__(self, file = None, separator = ", ", per_line = 0):
+      self.file = file if file is not None else tempfile.TemporaryFile("w+")
+      self.separator = separator
+      self.per_line = per_line
+      self.count = 0
+
+   def __len__(self):
+      return self.count
+
+   def append(self, key):
+      if self.per_line:
+         self.file.write(str(key) + self.separator)
+         if (self.count + 1) % self.per_line == 0:
+            self.file.write("\n")
+      elif self.count:
+         self.file.write(self.separator + str(key))
+      else:
+         self.file.write(str(key))
+      self.count += 1
+
+   def write_to(self, f):
+      """Copies the collected keys to f, wrapped in [] unless per_line"""
+      if not self.per_line:
+         f.write("[")
+      self.file.seek(0)
+      shutil.copyfileobj(self.file, f)
+      if not self.per_line:
+         f.write("]")
+
+   def close(self):
+      self.file.close()
+
+def listed(keys, listing):
+   """Passes keys through unchanged, recording each one in listing
+   
+   Args:
+      keys (int iterable): the keys to be hashed
+      listing (KeySpool): where to record the keys
+   
+   Yields:
+      key (int): the next key to be hashed
+   """
+   for key in keys:
+      listing.append(key)
+      yield key
+
+def write_input(f, listing):
+   """Writes the input key section of the report
+   
+   Args:
+      f (file): the file to write to
+      listing (KeySpool): the input keys, five to a line
+   """
+   f.write("Input keys size: " + str(len(listing)) + "\n")
+   f.write("Table size: 120\n")
+   f.write("Input keys: \n")
+   listing.write_to(f)
+   f.write("\n=====================\n")
+
+def write_stats(f, table, bucket_size, collision_scheme, primary_collisions, \
+                secondary_collisions, num_comparisons, not_inserted, \
+                num_items=None):
+   """Writes the stats section of the report, formatted as stats_string
+   
+   Args:
+      f (file): the file to write to
+      table (int array): the table to be printed
+      bucket_size (int): the number of elements allowed in each bucket
+      collision_scheme (string): the collision resolution method used
+      primary_collsions (int): number of primary collisions
+      secondary_collisions (int): number of secondary collisions
+      num_comparisons (int): number of comparisons performed
+      not_inserted (int list or KeySpool): the keys not inserted
+      num_items (int): number of keys in the table, counted from the table if
+         not given
+   """
+   f.write("Hash Table size: 120 \n")
+   f.write("Bucket Size: " + str(bucket_size) + "\n")
+   f.write("Collision Scheme: " + collision_scheme + "\n")
+   f.write("Primary Collisions: " + str(primary_collisions) + "\n")
+   f.write("Secondary Collisions: " + str(secondary_collisions) + "\n")
+   f.write("Number of comparisions: " + str(num_comparisons) + "\n")
+   f.write("Number not inserted: " + str(len(not_inserted)) + "\n")
+   f.write("Keys not inserted: ")
+   if isinstance(not_inserted, KeySpool):
+      not_inserted.write_to(f)
+   else:
+      f.write(str(not_inserted))
+   f.write("\n")
+   # calculate load
+   if num_items is None:
+      num_items = sum(len(elem) for bucket in table for elem in bucket)
+   f.write("Load Factor: " + str(num_items / 120) + "\n\n")
+   f.write("============================= \n\n")
+   f.write("Hash Table\n")
+
+def write_table(f, table, bucket_size, collision_scheme, max_rows=None):
+   """Writes the hash table one row at a time, formatted as pretty_print
+   
+   A row holds five buckets when bucket_size is 1, otherwise one bucket. For
+   huge tables, where formatting dominates the runtime, max_rows limits the
+   output to that many evenly spaced rows (0 suppresses the table), followed
+   by a note of how many rows were shown.
+   
+   Args:
+      f (file): the file to write to
+      table (int array): the table to be printed
+      bucket_size (int): the number of elements allowed in each bucket
+      collision_scheme (string): the collision resolution method used
+      max_rows (int): the most rows to print, all if None
+   """
+   per_row = 5 if bucket_size == 1 else 1
+   num_rows = -(-len(table) // per_row)
+   if max_rows is None or max_rows >= num_rows:
+      rows = range(num_rows)
+   else:
+      rows = [r * num_rows // max_rows for r in range(max_rows)]
+   for r in rows:
+      f.write(str(r + 1) + " ")
+      row = table[r * per_row:(r + 1) * per_row]
+      for bucket in row:
+         for elem in bucket:
+            # if there is an element present, print it
+            if elem:
+               # handle chaining
+               if collision_scheme == "chaining":
+                  f.write("->".join(str(e).zfill(5) for e in elem))
+               else:
+                  f.write(str(elem[0]).zfill(5))
+            # if no element, add filler
+            else:
+               f.write("-----")
+            f.write(" ")
+      if len(row) == per_row:
+         f.write("\n")
+   if len(rows) < num_rows:
+      f.write("(" + str(len(rows)) + " of " + str(num_rows) + \
+              " rows shown)\n")
+
+def stream_report(input_filename, f, modulus, bucket_size, collision_scheme, \
+                  personal_hash, chunk_size=1 << 20, max_rows=None, \
+                  profiler=None):
+   """Hashes a key file and writes the report without holding the keys
+   
+   Keys are parsed in chunks and inserted as they arrive. The key listing
+   and the keys not inserted are spooled to temporary files, so memory is 
+   bounded by the table itself rather than by the size of the input.
+   
+   Args:
+      input_filename (string): the key file to hash
+      f (file): the file to write the report to
+      modulus (int): the modulus to perform hashing with
+      bucket_size (int): the bucket size of the hash table
+      collision_scheme (string): the collision resolution method to use, must
+         be one of: linear, quadratic, double, chaining
+      personal_hash (boolean): flag to use personal_hash (1) or not (0)
+      chunk_size (int): the number of bytes to read at a time
+      max_rows (int): the most table rows to print, all if None
+      profiler (Profiler): records the parse, compute, probe and write 
+         phases. Formatting streams straight into f, so it is part of write
+   """
+   if profiler is None:
+      profiler = Profiler(enabled = False)
+   listing = KeySpool(separator = " ", per_line = 5)
+   not_inserted = KeySpool()
+   try:
+      keys = profiler.timed("parse", iter_keys(input_filename, chunk_size))
+      with profiler.phase("compute"):
+         table, primary_collisions, secondary_collisions, num_comparisons, \
+            not_inserted, num_items = hash(listed(keys, listing), modulus, \
+               bucket_size, collision_scheme, personal_hash, not_inserted, \
+               profiler)
+      profiler.count("keys", len(listing))
+      profiler.count("primary_collisions", primary_collisions)
+      profiler.count("num_comparisons", num_comparisons)
+      with profiler.phase("write"):
+         write_input(f, listing)
+         write_stats(f, table, bucket_size, collision_scheme, \
+                     primary_collisions, secondary_collisions, \
+                     num_comparisons, not_inserted, num_items)
+         write_table(f, table, bucket_size, collision_scheme, max_rows)
+   finally:
+      listing.close()
+      not_inserted.close()
+
+def iter_keys(filename, chunk_size=1 << 20):
+   """Streams keys from a text file
+   
+   Reads the file in fixed size chunks, so only one chunk is held in memory
+   at a time, and yields each key as soon as its line is complete
+   
+   Args:
+      filename (string): the name of the file to be read
+      chunk_size (int): the number of bytes to read at a time
+   
+   Yields:
+      key (int): the next key to be hashed
+   """
+   with open(filename, "rb") as file:
+      remainder = b""
+      while True:
+         chunk = file.read(chunk_size)
+         if not chunk:
+            break
+         lines = (remainder + chunk).split(b"\n")
+         # the last line may continue in the next chunk
+         remainder = lines.pop()
+         for line in lines:
+            line = line.strip()
+            if line.isdigit():
+               yield int(line)
+      line = remainder.strip()
+      if line.isdigit():
+         yield int(line)
 
 def read_file(filename):
    """Reads in a text file
@@ -296,14 +727,7 @@ def read_file(filename):
    Returns:
       arr (int list): the keys to be hashed
    """
-   file = open(filename, "r")
-   arr = []
-   for line in file:
-      line = line.strip()
-      if line.isdigit():
-         arr.append(int(line))
-   file.close()
-   return arr
+   return list(iter_keys(filename))
 
 def write_file(filename, string):
    """Writes to a text file
@@ -317,71 +741,112 @@ def write_file(filename, string):
    with open(filename, 'w') as f:
       f.write(string)
 
-argument_list = sys.argv[1:]
-options = "hp:m:b:c:i:o:"
-long_options = ["help", "personal_hash", "output", "modulus", "bucket_size",\
-                "collision_scheme", "input"]
+def main(argv=None):
+   """Command line entry point, see the module docstring for the arguments
+   
+   Args:
+      argv (string list): the command line arguments, sys.argv[1:] if None
+   """
+   argument_list = sys.argv[1:] if argv is None else argv
+   options = "hnp:m:b:c:i:o:r:"
+   long_options = ["help", "numpy", "personal_hash", "output", "modulus", \
+                   "bucket_size", "collision_scheme", "input", "rows=", \
+                   "profile=", "cprofile=", "trace_memory"]
 
-# parse command line arguments
-try:
-   arguments, values = getopt.getopt(argument_list, options, long_options)
-   output_filename = ""
-   help_string = "-p, --personal_hash: a flag for whether my personal hash \
+   # parse command line arguments
+   try:
+      arguments, values = getopt.getopt(argument_list, options, long_options)
+      output_filename = ""
+      personal_hash = 0
+      bulk = 0
+      max_rows = None
+      profile_filename = ""
+      cprofile_filename = None
+      trace_memory = 0
+      help_string = "-p, --personal_hash: a flag for whether my personal hash \
 should be used \n\
 -o, --output: the filename of the output file. Running without this prints\
  output to terminal \n\
 -m, --modulus: the modulus you wish to use \n\
 -b, --bucket_size: the bucket size you wish to use\n\
 -c, --collision_scheme: the collision scheme \
-(linear, quadratic, or chaining)\n\
--i, --input: the input filename"
-   for current_argument, current_value in arguments:
-      if current_argument in ("-h", "--help"):
-         print(help_string)
-         exit()
-      elif current_argument in ("-p", "--personal_hash"):
-         personal_hash = int(current_value)
-      elif current_argument in ("-o", "--output"):
-         output_filename = current_value
-      elif current_argument in ("-m", "--modulus"):
-         modulus = int(current_value)
-      elif current_argument in ("-b", "--bucket_size"):
-         bucket_size = int(current_value)
-      elif current_argument in ("-c", "--collision_scheme"):
-         collision_scheme = current_value
-      elif current_argument in ("-i", "--input"):
-         input_filename = current_value
-except getopt.error as err:
-   print(str(err))
-
-# Exception handling
-if collision_scheme not in ("linear", "quadratic", "chaining"):
-   raise Exception("collision_scheme must be one of: linear, quadratic, \
-                   chaining")
-if not isinstance(modulus, int) or modulus == 0:
-   raise Exception("modulus must be an integer not equal to 0")
-if not isinstance(bucket_size, int) or bucket_size < 1 or bucket_size > 120:
-   raise Exception("bucket_size must be an integer 1 <= bucket_size <= 120")
-if modulus > 120/bucket_size:
-   raise Exception("modulus must be < 120/bucket_size")
-
-# File extension formatting
-if output_filename[-4:] != ".txt":
-   output_filename += ".txt"
-if input_filename[-4:] != ".txt":
-   input_filename += ".txt"
-
-
-input = read_file(input_filename)
-table, primary_collisions, secondary_collisions, num_comparisons, \
-   not_inserted = hash(input, modulus, bucket_size, collision_scheme, \
-                       personal_hash)
-output_string = input_string(input) + stats_string(table, bucket_size, \
-               collision_scheme, primary_collisions, secondary_collisions, \
-                  num_comparisons, not_inserted) +\
-               pretty_print(table, bucket_size, collision_scheme)
-
-if output_filename != ".txt":
-   write_file(output_filename, output_string)
-else:
-   print(output_string)
\ No newline at end of file
+(linear, quadratic, double, or chaining)\n\
+-i, --input: the input filename\n\
+-n, --numpy: hash with the vectorized NumPy path and report the bucket \
+distribution\n\
+-r, --rows: the most hash table rows to print, sampled evenly (0 omits the \
+table)\n\
+--profile: the JSON file to write phase timings, peak memory and counters to\n\
+--cprofile: the file to write a cProfile dump to (requires --profile)\n\
+--trace_memory: also trace the peak memory allocated by Python (slows the \
+run down, do not compare its phase times with untraced runs)"
+      for current_argument, current_value in arguments:
+         if current_argument in ("-h", "--help"):
+            print(help_string)
+            return
+         elif current_argument in ("-n", "--numpy"):
+            bulk = 1
+         elif current_argument in ("-p", "--personal_hash"):
+            personal_hash = int(current_value)
+         elif current_argument in ("-o", "--output"):
+            output_filename = current_value
+         elif current_argument in ("-m", "--modulus"):
+            modulus = int(current_value)
+         elif current_argument in ("-b", "--bucket_size"):
+            bucket_size = int(current_value)
+         elif current_argument in ("-c", "--collision_scheme"):
+            collision_scheme = current_value
+         elif current_argument in ("-i", "--input"):
+            input_filename = current_value
+         elif current_argument in ("-r", "--rows"):
+            max_rows = int(current_value)
+         elif current_argument == "--profile":
+            profile_filename = current_value
+         elif current_argument == "--cprofile":
+            cprofile_filename = current_value
+         elif current_argument == "--trace_memory":
+            trace_memory = 1
+   except getopt.error as err:
+      print(str(err))
+
+   # Exception handling
+   check_arguments(modulus, bucket_size, collision_scheme)
+   if max_rows is not None and max_rows < 0:
+      raise Exception("rows must be at least 0")
+
+   # File extension formatting
+   if output_filename[-4:] != ".txt":
+      output_filename += ".txt"
+   if input_filename[-4:] != ".txt":
+      input_filename += ".txt"
+
+   profiler = Profiler("hashing", bool(profile_filename), cprofile_filename, \
+                       bool(trace_memory))
+   profiler.start()
+   if bulk:
+      with profiler.phase("parse"):
+         input = read_file(input_filename)
+      output_string = run(input, modulus, bucket_size, collision_scheme, \
+                          personal_hash, bulk, max_rows, profiler)["report"]
+      with profiler.phase("write"):
+         if output_filename != ".txt":
+            write_file(output_filename, output_string)
+         else:
+            print(output_string)
+   # stream the keys in and the report out
+   elif output_filename != ".txt":
+      with open(output_filename, 'w') as f:
+         stream_report(input_filename, f, modulus, bucket_size, \
+                       collision_scheme, personal_hash, max_rows=max_rows, \
+                       profiler=profiler)
+   else:
+      stream_report(input_filename, sys.stdout, modulus, bucket_size, \
+                    collision_scheme, personal_hash, max_rows=max_rows, \
+                    profiler=profiler)
+      print()
+   profiler.stop()
+   if profile_filename:
+      profiler.write(profile_filename)
+
+if __name__ == "__main__":
+   main()
@@ -0,0 +1,343 @@
+import getopt, sys, csv, itertools, random, threading, time
+try:
+   from .Project import probe_sequence, has_space
+except ImportError:
+   from Project import probe_sequence, has_space
+"""
+This program provides a thread-safe sharded hash table and benchmarks it
+under concurrent inserts and lookups.
+
+The key space is split across independently locked shards, key mod the
+number of shards picking the shard. Each shard is an ordinary table of
+buckets, hashed and probed the same way as Project.py, so threads only wait
+on each other when they touch the same shard.
+
+It can be run from the command line by providing arguments:
+-t, --threads: comma separated thread counts to test (default 1,2,4,8)
+-s, --shards: comma separated shard counts to test (default 1,4,16)
+-c, --collision_schemes: comma separated collision schemes (linear,
+                         quadratic, double, chaining)
+-b, --bucket_size: the bucket size of every shard (default 1)
+-n, --num_keys: the number of random keys inserted (default 100000)
+-l, --load_factor: keys / slots, sizes the table (default 0.75)
+-r, --repeats: the number of timed runs per combination, the fastest is kept
+-e, --seed: the seed for the random keys
+-o, --output: the filename of the output CSV (default sharded.csv)
+-f, --free_threaded: refuse to run unless the GIL is disabled
+
+With the GIL, only one thread runs Python code at a time, so throughput
+cannot scale with threads and the contention measured comes from threads
+being switched out while holding a lock. On a free-threaded build (3.13t
+and later, run with the GIL disabled) threads really run in parallel. Each
+CSV row records whether the GIL was enabled, so runs from both builds can be
+compared.
+"""
+
+FIELDS = ["gil_enabled", "collision_scheme", "bucket_size", "num_shards", \
+          "threads", "num_keys", "inserts_per_sec", "lookups_per_sec", \
+          "lock_acquisitions", "contended", "contention_rate", \
+          "lock_wait_seconds", "num_not_inserted"]
+
+def gil_enabled():
+   """Checks whether the interpreter is running with the GIL
+
+   Returns:
+      (boolean): False only on a free-threaded build with the GIL disabled
+   """
+   is_gil_enabled = getattr(sys, "_is_gil_enabled", None)
+   return True if is_gil_enabled is None else is_gil_enabled()
+
+class ShardedTable:
+   """Hash table split into shards that each have their own lock
+
+   A key lives in shard key mod num_shards and hashes to bucket
+   (key // num_shards) mod shard_size inside it, colliding keys follow
+   probe_sequence within the shard. Every insert and lookup holds its
+   shard's lock, and records whether it had to wait for it.
+   """
+   def __init__(self, num_shards, shard_size, bucket_size, collision_scheme):
+      self.num_shards = num_shards
+      self.shard_size = shard_size
+      self.collision_scheme = collision_scheme
+      self.shards = [[[list() for j in range(bucket_size)] \
+                      for i in range(shard_size)] for s in range(num_shards)]
+      self.locks = [threading.Lock() for s in range(num_shards)]
+      # per shard, only updated while holding that shard's lock
+      self.num_items = [0] * num_shards
+      self.not_inserted = [0] * num_shards
+      self.acquisitions = [0] * num_shards
+      self.contended = [0] * num_shards
+      self.wait = [0.0] * num_shards
+
+   def acquire(self, shard):
+      """Takes a shard's lock, timing the wait if another thread holds it"""
+      lock = self.locks[shard]
+      if lock.acquire(blocking=False):
+         self.acquisitions[shard] += 1
+         return
+      begin = time.perf_counter()
+      lock.acquire()
+      self.wait[shard] += time.perf_counter() - begin
+      self.acquisitions[shard] += 1
+      self.contended[shard] += 1
+
+   def insert(self, key):
+      """Inserts a key
+
+      Args:
+         key (int): the key to insert
+
+      Returns:
+         (boolean): False if the shard was full and the key was not inserted
+      """
+      shard = key % self.num_shards
+      table = self.shards[shard]
+      home = (key // self.num_shards) % self.shard_size
+      self.acquire(shard)
+      try:
+         loc = has_space(table[home])
+         if loc != -1 or self.collision_scheme == "chaining":
+            table[home][loc].append(key)
+            self.num_items[shard] += 1
+            return True
+         for i in probe_sequence(key, home, self.shard_size, \
+                                 self.collision_scheme):
+            loc = has_space(table[i])
+            if loc != -1:
+               table[i][loc].append(key)
+               self.num_items[shard] += 1
+               return True
+         self.not_inserted[shard] += 1
+         return False
+      finally:
+         self.locks[shard].release()
+
+   def contains(self, key):
+      """Looks up a key
+
+      Keys are never removed, so a probe can stop at the first bucket with
+      space: the key would have been stored there
+
+      Args:
+         key (int): the key to find
+
+      Returns:
+         (boolean): whether the key is in the table
+      """
+      shard = key % self.num_shards
+      table = self.shards[shard]
+      home = (key // self.num_shards) % self.shard_size
+      self.acquire(shard)
+      try:
+         if self.collision_scheme == "chaining":
+            return any(key in slot for slot in table[home])
+         for i in itertools.chain((home,), probe_sequence(key, home, \
+               self.shard_size, self.collision_scheme)):
+            if [key] in table[i]:
+               return True
+            if has_space(table[i]) != -1:
+               return False
+         return False
+      finally:
+         self.locks[shard].release()
+
+   def stats(self):
+      """Totals the per shard counters
+
+      Returns:
+         stats (dict): num_items, num_not_inserted, lock_acquisitions,
+            contended (acquisitions that had to wait) and lock_wait_seconds
+      """
+      return {"num_items": sum(self.num_items),
+              "num_not_inserted": sum(self.not_inserted),
+              "lock_acquisitions": sum(self.acquisitions),
+              "contended": sum(self.contended),
+              "lock_wait_seconds": sum(self.wait)}
+
+def run_threads(function, keys, threads):
+   """Calls function on every key, split across threads
+
+   Thread t handles keys[t::threads]. The clock starts once every thread is
+   ready, so thread start up is not timed.
+
+   Args:
+      function (function): called with each key
+      keys (int list): the keys to process
+      threads (int): the number of threads
+
+   Returns:
+      elapsed (float): the time until every thread finished
+   """
+   barrier = threading.Barrier(threads + 1)
+   def work(part):
+      barrier.wait()
+      for key in part:
+         function(key)
+   workers = [threading.Thread(target=work, args=(keys[t::threads],)) \
+              for t in range(threads)]
+   for worker in workers:
+      worker.start()
+   barrier.wait()
+   begin = time.perf_counter()
+   for worker in workers:
+      worker.join()
+   return time.perf_counter() - begin
+
+def benchmark(thread_counts, shard_counts, collision_schemes, bucket_size, \
+              num_keys, load_factor, repeats, seed):
+   """Runs every combination of the given parameters
+
+   Args:
+      thread_counts (int list): the numbers of threads to test
+      shard_counts (int list): the numbers of shards to test
+      collision_schemes (string list): the collision schemes to test
+      bucket_size (int): the bucket size of every shard
+      num_keys (int): the number of random keys inserted
+      load_factor (float): keys / slots, sizes the table
+      repeats (int): the number of timed runs per combination
+      seed (int): the seed for the random keys
+
+   Returns:
+      rows (list): one dictionary of FIELDS per combination
+   """
+   rng = random.Random(seed)
+   keys = [rng.randrange(num_keys * 10) for _ in range(num_keys)]
+   slots = int(num_keys / load_factor)
+   gil = gil_enabled()
+   rows = []
+   for collision_scheme in collision_schemes:
+      for num_shards in shard_counts:
+         shard_size = max(slots // (num_shards * bucket_size), 1)
+         for threads in thread_counts:
+            runs = []
+            for _ in range(repeats):
+               table = ShardedTable(num_shards, shard_size, bucket_size, \
+                                    collision_scheme)
+               insert_time = run_threads(table.insert, keys, threads)
+               lookup_time = run_threads(table.contains, keys, threads)
+               runs.append((insert_time + lookup_time, insert_time, \
+                            lookup_time, table.stats()))
+            # keep the fastest run, contention is from that run too
+            total, insert_time, lookup_time, stats = min(runs, \
+               key=lambda run: run[0])
+            rows.append({
+               "gil_enabled": gil,
+               "collision_scheme": collision_scheme,
+               "bucket_size": bucket_size,
+               "num_shards": num_shards,
+               "threads": threads,
+               "num_keys": num_keys,
+               "inserts_per_sec": num_keys / insert_time \
+                  if insert_time else 0,
+               "lookups_per_sec": num_keys / lookup_time \
+                  if lookup_time else 0,
+               "lock_acquisitions": stats["lock_acquisitions"],
+               "contended": stats["contended"],
+               "contention_rate": stats["contended"] / \
+                  stats["lock_acquisitions"] \
+                  if stats["lock_acquisitions"] else 0,
+               "lock_wait_seconds": stats["lock_wait_seconds"],
+               "num_not_inserted": stats["num_not_inserted"]})
+   return rows
+
+def write_csv(filename, rows):
+   """Writes the benchmark results to a CSV file
+
+   Args:
+      filename (string): the file to write to (overwrites the file)
+      rows (list): one dictionary of FIELDS per combination
+   """
+   with open(filename, 'w', newline="", encoding='UTF8') as f:
+      writer = csv.DictWriter(f, fieldnames=FIELDS)
+      writer.writeheader()
+      writer.writerows(rows)
+
+def main(argv=None):
+   """Command line entry point, see the module docstring for the arguments
+
+   Args:
+      argv (string list): the command line arguments, sys.argv[1:] if None
+   """
+   argument_list = sys.argv[1:] if argv is None else argv
+   options = "ht:s:c:b:n:l:r:e:o:f"
+   long_options = ["help", "threads=", "shards=", "collision_schemes=", \
+                   "bucket_size=", "num_keys=", "load_factor=", "repeats=", \
+                   "seed=", "output=", "free_threaded"]
+
+   thread_counts = [1, 2, 4, 8]
+   shard_counts = [1, 4, 16]
+   collision_schemes = ["linear", "quadratic", "double", "chaining"]
+   bucket_size = 1
+   num_keys = 100000
+   load_factor = .75
+   repeats = 3
+   seed = 0
+   output_filename = "sharded.csv"
+   free_threaded = 0
+
+   # parse command line arguments
+   try:
+      arguments, values = getopt.getopt(argument_list, options, long_options)
+      help_string = "-t, --threads: comma separated thread counts \
+(default 1,2,4,8)\n\
+-s, --shards: comma separated shard counts (default 1,4,16)\n\
+-c, --collision_schemes: comma separated collision schemes \
+(linear, quadratic, double, chaining)\n\
+-b, --bucket_size: the bucket size of every shard (default 1)\n\
+-n, --num_keys: the number of random keys inserted (default 100000)\n\
+-l, --load_factor: keys / slots, sizes the table (default 0.75)\n\
+-r, --repeats: the number of timed runs per combination\n\
+-e, --seed: the seed for the random keys\n\
+-o, --output: the filename of the output CSV (default sharded.csv)\n\
+-f, --free_threaded: refuse to run unless the GIL is disabled"
+      for current_argument, current_value in arguments:
+         if current_argument in ("-h", "--help"):
+            print(help_string)
+            return
+         elif current_argument in ("-t", "--threads"):
+            thread_counts = [int(t) for t in current_value.split(",")]
+         elif current_argument in ("-s", "--shards"):
+            shard_counts = [int(s) for s in current_value.split(",")]
+         elif current_argument in ("-c", "--collision_schemes"):
+            collision_schemes = current_value.split(",")
+         elif current_argument in ("-b", "--bucket_size"):
+            bucket_size = int(current_value)
+         elif current_argument in ("-n", "--num_keys"):
+            num_keys = int(current_value)
+         elif current_argument in ("-l", "--load_factor"):
+            load_factor = float(current_value)
+         elif current_argument in ("-r", "--repeats"):
+            repeats = int(current_value)
+         elif current_argument in ("-e", "--seed"):
+            seed = int(current_value)
+         elif current_argument in ("-o", "--output"):
+            output_filename = current_value
+         elif current_argument in ("-f", "--free_threaded"):
+            free_threaded = 1
+   except getopt.error as err:
+      print(str(err))
+
+   # Exception handling
+   for collision_scheme in collision_schemes:
+      if collision_scheme not in ("linear", "quadratic", "double", \
+                                  "chaining"):
+         raise Exception("collision_scheme must be one of: linear, \
+quadratic, double, chaining")
+   if min(thread_counts) < 1 or min(shard_counts) < 1:
+      raise Exception("threads and shards must be at least 1")
+   if bucket_size < 1:
+      raise Exception("bucket_size must be at least 1")
+   if num_keys < 1 or not 0 < load_factor <= 1:
+      raise Exception("num_keys must be at least 1 and 0 < load_factor <= 1")
+   if repeats < 1:
+      raise Exception("repeats must be at least 1")
+   if free_threaded and gil_enabled():
+      raise Exception("the GIL is enabled, run a free-threaded build with \
+PYTHON_GIL=0 (or -X gil=0)")
+
+   rows = benchmark(thread_counts, shard_counts, collision_schemes, \
+                    bucket_size, num_keys, load_factor, repeats, seed)
+   write_csv(output_filename, rows)
+
+if __name__ == "__main__":
+   main()
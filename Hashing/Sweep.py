@@ -0,0 +1,195 @@
+import getopt, sys, csv, glob, json, os, itertools
+from concurrent.futures import ProcessPoolExecutor
+try:
+   from .Project import hash, check_arguments, read_file
+except ImportError:
+   from Project import hash, check_arguments, read_file
+"""
+This program runs a grid of hashing configurations in a single process
+pool, instead of one Project.py process per configuration.
+
+Each key file is parsed once and handed to every worker when the pool
+starts, so each configuration only pays for hashing. The stats for every
+configuration are written to one CSV file.
+
+It can be run from the command line by providing arguments:
+-g, --grid: the JSON grid spec (see below)
+-w, --workers: the number of worker processes (default: number of CPUs)
+-o, --output: the filename of the output CSV (default sweep.csv)
+
+The grid spec lists the values to try for each Project.py argument, and
+every combination is run. "input" may contain glob patterns, relative to
+the directory of the grid spec:
+{
+   "input": ["Test Cases/*.txt"],
+   "modulus": [41, 113, 120],
+   "bucket_size": [1, 3],
+   "collision_scheme": ["linear", "quadratic", "double", "chaining"],
+   "personal_hash": [0, 1]
+}
+Combinations that Project.py would reject (e.g. modulus > 120/bucket_size)
+are skipped.
+"""
+
+FIELDS = ["input", "num_keys", "modulus", "bucket_size", "collision_scheme", \
+          "personal_hash", "primary_collisions", "secondary_collisions", \
+          "num_comparisons", "num_not_inserted", "load_factor"]
+
+# key sets shared by every task in a worker, set by load_keys
+key_sets = {}
+
+def load_keys(keys):
+   """Pool initializer, stores the parsed key files in the worker
+
+   Args:
+      keys (dict): input filename -> int list of keys
+   """
+   global key_sets
+   key_sets = keys
+
+def read_grid(filename):
+   """Reads a grid spec and expands it into configurations
+
+   Args:
+      filename (string): the JSON grid spec
+
+   Returns:
+      inputs (string list): the key files named by the grid, input patterns
+         are resolved relative to the directory of the grid spec
+      configs (list): (input, modulus, bucket_size, collision_scheme,
+         personal_hash) for every valid combination
+      num_skipped (int): the number of invalid combinations
+   """
+   with open(filename, 'r') as f:
+      grid = json.load(f)
+   for name in ("input", "modulus", "bucket_size", "collision_scheme", \
+                "personal_hash"):
+      if name not in grid:
+         raise Exception("grid spec is missing " + name)
+
+   inputs = []
+   directory = os.path.dirname(filename)
+   for pattern in grid["input"]:
+      matches = sorted(glob.glob(os.path.join(directory, pattern)))
+      if not matches:
+         raise Exception("input " + pattern + " matches no files in " + \
+                         (directory or "."))
+      inputs += [m for m in matches if m not in inputs]
+
+   configs = []
+   num_skipped = 0
+   for config in itertools.product(inputs, grid["modulus"], \
+                                   grid["bucket_size"], \
+                                   grid["collision_scheme"], \
+                                   grid["personal_hash"]):
+      try:
+         check_arguments(config[1], config[2], config[3])
+      except Exception:
+         num_skipped += 1
+         continue
+      configs.append(config)
+   return inputs, configs, num_skipped
+
+def run_config(config):
+   """Hashes one configuration with the worker's parsed keys
+
+   Args:
+      config (tuple): (input, modulus, bucket_size, collision_scheme,
+         personal_hash)
+
+   Returns:
+      row (dict): the stats for the configuration, keyed by FIELDS
+   """
+   input, modulus, bucket_size, collision_scheme, personal_hash = config
+   keys = key_sets[input]
+   table, primary_collisions, secondary_collisions, num_comparisons, \
+      not_inserted, num_items = hash(keys, modulus, bucket_size, \
+                                     collision_scheme, personal_hash)
+   return {"input": input,
+           "num_keys": len(keys),
+           "modulus": modulus,
+           "bucket_size": bucket_size,
+           "collision_scheme": collision_scheme,
+           "personal_hash": personal_hash,
+           "primary_collisions": primary_collisions,
+           "secondary_collisions": secondary_collisions,
+           "num_comparisons": num_comparisons,
+           "num_not_inserted": len(not_inserted),
+           "load_factor": num_items / 120}
+
+def sweep(inputs, configs, workers=None):
+   """Runs every configuration across a process pool
+
+   Args:
+      inputs (string list): the key files, each parsed once
+      configs (list): the configurations from read_grid
+      workers (int): the number of worker processes, one per CPU if None
+
+   Returns:
+      rows (list): the stats for each configuration, in order
+   """
+   keys = {input: read_file(input) for input in inputs}
+   # batch tasks so workers are not waiting on the queue for tiny jobs
+   workers = workers or os.cpu_count() or 1
+   chunksize = max(1, len(configs) // (workers * 4))
+   with ProcessPoolExecutor(max_workers=workers, initializer=load_keys, \
+                            initargs=(keys,)) as pool:
+      return list(pool.map(run_config, configs, chunksize=chunksize))
+
+def write_csv(filename, rows):
+   """Writes the sweep results to a CSV file
+
+   Args:
+      filename (string): the file to write to (overwrites the file)
+      rows (list): the stats for each configuration
+   """
+   with open(filename, 'w', newline="", encoding='UTF8') as f:
+      writer = csv.DictWriter(f, fieldnames=FIELDS)
+      writer.writeheader()
+      writer.writerows(rows)
+
+def main(argv=None):
+   """Command line entry point, see the module docstring for the arguments
+
+   Args:
+      argv (string list): the command line arguments, sys.argv[1:] if None
+   """
+   argument_list = sys.argv[1:] if argv is None else argv
+   options = "hg:w:o:"
+   long_options = ["help", "grid=", "workers=", "output="]
+   grid_filename = ""
+   workers = None
+   output_filename = "sweep.csv"
+
+   # parse command line arguments
+   try:
+      arguments, values = getopt.getopt(argument_list, options, long_options)
+      help_string = "-g, --grid: the JSON grid spec\n\
+-w, --workers: the number of worker processes (default: number of CPUs)\n\
+-o, --output: the filename of the output CSV (default sweep.csv)"
+      for current_argument, current_value in arguments:
+         if current_argument in ("-h", "--help"):
+            print(help_string)
+            return
+         elif current_argument in ("-g", "--grid"):
+            grid_filename = current_value
+         elif current_argument in ("-w", "--workers"):
+            workers = int(current_value)
+         elif current_argument in ("-o", "--output"):
+            output_filename = current_value
+   except getopt.error as err:
+      print(str(err))
+
+   # Exception handling
+   if not grid_filename:
+      raise Exception("Please specify the grid spec with -g")
+   if workers is not None and workers < 1:
+      raise Exception("workers must be at least 1")
+
+   inputs, configs, num_skipped = read_grid(grid_filename)
+   if num_skipped:
+      print("Skipped " + str(num_skipped) + " invalid configurations")
+   write_csv(output_filename, sweep(inputs, configs, workers))
+
+if __name__ == "__main__":
+   main()
@@ -0,0 +1,11 @@
+"""
+Hashing strategies (see Project.py), plus the benchmark (Benchmark.py) and
+parameter sweep (Sweep.py) tools built on them, and a thread-safe sharded
+table (Sharded.py).
+
+Importing the package has no side effects; each tool's command line is
+available as its main() function.
+"""
+from .Project import hash, bulk_hash, run, check_arguments, read_file, \
+   iter_keys, stream_report, main
+from .Sharded import ShardedTable
@@ -0,0 +1,95 @@
+import hashlib, json, os, tempfile
+
+class ResultCache:
+   """Persistent, size bounded cache of alignment results
+
+   Each result is stored as a JSON file named by the SHA-256 of the inputs
+   that produced it, (seq_a, seq_b, match, mismatch, gap), so the cache can
+   be shared between runs and input files. Reading an entry refreshes its
+   modification time; once the entries take more than max_bytes, the least
+   recently used are deleted, including when an existing cache is opened
+   with a smaller max_bytes.
+   """
+   def __init__(self, directory, max_bytes = 100 * 2**20):
+      self.directory = directory
+      self.max_bytes = max_bytes
+      os.makedirs(directory, exist_ok = True)
+      self.size = sum(entry.stat().st_size for entry in self.entries())
+      if self.size > self.max_bytes:
+         self.evict()
+
+   def entries(self):
+      return [entry for entry in os.scandir(self.directory) \
+              if entry.name.endswith(".json")]
+
+   def key(self, seq_a, seq_b, match_value, mismatch_penalty, gap_penalty):
+      """Hashes the inputs of an alignment
+
+      Returns:
+         key (string): the hex digest naming the cache entry
+      """
+      inputs = json.dumps([seq_a, seq_b, match_value, mismatch_penalty, \
+                           gap_penalty])
+      return hashlib.sha256(inputs.encode("utf-8")).hexdigest()
+
+   def path(self, key):
+      return os.path.join(self.directory, key + ".json")
+
+   def get(self, key):
+      """Looks up a result
+
+      Args:
+         key (string): the output of key()
+
+      Returns:
+         result (dict): the cached result, or None if it is not cached
+      """
+      try:
+         with open(self.path(key), 'r') as f:
+            result = json.load(f)
+      except (OSError, ValueError):
+         return None
+      # mark as recently used
+      try:
+         os.utime(self.path(key))
+      except OSError:
+         pass
+      return result
+
+   def put(self, key, result):
+      """Stores a result, evicting old entries if the cache is too large
+
+      Args:
+         key (string): the output of key()
+         result (dict): the JSON serializable result to store
+      """
+      if os.path.exists(self.path(key)):
+         self.size -= os.path.getsize(self.path(key))
+      # write to a temporary file first so readers never see a partial entry
+      fd, temp = tempfile.mkstemp(dir = self.directory, suffix = ".tmp")
+      try:
+         with os.fdopen(fd, 'w') as f:
+            json.dump(result, f)
+         os.replace(temp, self.path(key))
+      except BaseException:
+         os.remove(temp)
+         raise
+      self.size += os.path.getsize(self.path(key))
+      if self.size > self.max_bytes:
+         self.evict()
+
+   def evict(self):
+      """Deletes least recently used entries until the cache is at 90% of
+      max_bytes, so eviction does not run again on every put"""
+      entries = sorted(self.entries(), key = lambda entry: \
+                       entry.stat().st_mtime)
+      self.size = sum(entry.stat().st_size for entry in entries)
+      for entry in entries:
+         if self.size <= self.max_bytes * .9:
+            break
+         size = entry.stat().st_size
+         try:
+            os.remove(entry.path)
+            self.size -= size
+         except OSError:
+            pass
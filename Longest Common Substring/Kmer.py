@@ -0,0 +1,110 @@
+"""
+k-mer prefilter for all-pairs alignment.
+
+An inverted index maps every k-mer (substring of length k) to the sequences
+containing it. Walking each k-mer's list of sequences counts the k-mers
+every pair shares, without looking at pairs that share none, and the count
+gives the Jaccard similarity of the pair's k-mer sets:
+   shared / (|kmers(a)| + |kmers(b)| - shared)
+Pairs below a threshold can then be skipped instead of aligned.
+
+Walking a list of d sequences costs d^2 / 2 updates, so k-mers found in more
+than max_postings sequences (stop k-mers) are left out of the index, which
+bounds the index to max_postings updates per k-mer of input. A pair's stop
+k-mers are handled on their own: if even sharing all of them could not lift
+the pair to the threshold, the pair is skipped, otherwise its stop k-mer
+sets are intersected for the exact similarity.
+
+The cost depends on k. The default k = 8 (align_all, --kmer_size) gives
+4^8 = 65536 possible DNA k-mers, so few of them are stop k-mers and most
+pairs are settled by the index. With small k, such as 4 (256 possible DNA
+k-mers), most k-mers are in most sequences, so in large inputs nearly every
+k-mer is a stop k-mer and nearly every pair is either skipped by the bound
+or costs a set intersection of up to 4^k k-mers.
+"""
+
+# k-mers in more sequences than this are stop k-mers
+MAX_POSTINGS = 64
+
+def kmers(sequence, k):
+   """Finds the distinct k-mers of a sequence
+
+   Args:
+      sequence (string): the sequence to split
+      k (int): the length of each k-mer
+
+   Returns:
+      (string set): every substring of length k
+   """
+   return {sequence[i:i + k] for i in range(len(sequence) - k + 1)}
+
+def build_index(kmer_sets):
+   """Builds the inverted index of k-mers
+
+   Args:
+      kmer_sets (list): the k-mer set of each sequence, from kmers()
+
+   Returns:
+      index (dict): k-mer -> ids (positions in kmer_sets) of the sequences
+         containing it, in increasing order
+   """
+   index = {}
+   for id, sequence_kmers in enumerate(kmer_sets):
+      for kmer in sequence_kmers:
+         index.setdefault(kmer, []).append(id)
+   return index
+
+def similarities(sequences, k, threshold=0.0, max_postings=MAX_POSTINGS):
+   """Estimates the similarity of every pair that shares a k-mer
+
+   Args:
+      sequences (string list): the sequences to compare
+      k (int): the length of each k-mer
+      threshold (float): the similarity the caller will align from. Pairs
+         that cannot reach it may get an upper bound instead of their exact
+         similarity
+      max_postings (int): k-mers in more sequences than this are stop
+         k-mers, see the module docstring
+
+   Returns:
+      similarity (dict): (i, j) with i > j -> Jaccard similarity of the
+         k-mer sets of sequences[i] and sequences[j], exact when it is at
+         least threshold, and otherwise possibly an upper bound still below
+         threshold. Pairs sharing no k-mer are left out, their similarity
+         is 0
+      sizes (int list): the number of distinct k-mers in each sequence
+   """
+   kmer_sets = [kmers(sequence, k) for sequence in sequences]
+   sizes = [len(sequence_kmers) for sequence_kmers in kmer_sets]
+   index = build_index(kmer_sets)
+   stop = {kmer for kmer, ids in index.items() if len(ids) > max_postings}
+
+   shared = {}
+   for kmer, ids in index.items():
+      if kmer in stop:
+         continue
+      for x in range(len(ids)):
+         for y in range(x):
+            pair = (ids[x], ids[y])
+            shared[pair] = shared.get(pair, 0) + 1
+   if not stop:
+      similarity = {pair: count / (sizes[pair[0]] + sizes[pair[1]] - count) \
+                    for pair, count in shared.items()}
+      return similarity, sizes
+
+   stop_sets = [sequence_kmers & stop for sequence_kmers in kmer_sets]
+   similarity = {}
+   for i in range(len(sequences)):
+      for j in range(i):
+         count = shared.get((i, j), 0)
+         # at most this many stop k-mers can be shared
+         most = min(len(stop_sets[i]), len(stop_sets[j]))
+         if most:
+            bound = (count + most) / (sizes[i] + sizes[j] - count - most)
+            if bound < threshold:
+               similarity[(i, j)] = bound
+               continue
+            count += len(stop_sets[i] & stop_sets[j])
+         if count:
+            similarity[(i, j)] = count / (sizes[i] + sizes[j] - count)
+   return similarity, sizes
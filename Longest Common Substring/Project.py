@@ -1,5 +1,16 @@
-import getopt, sys, csv
-from Cell import Cell
+import getopt, sys, os, csv
+try:
+   from .Cell import Cell
+   from .Cache import ResultCache
+   from .Kmer import similarities
+except ImportError:
+   from Cell import Cell
+   from Cache import ResultCache
+   from Kmer import similarities
+if not __package__:
+   # run as a script, Profiler.py is in the repo root one level up
+   sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from Profiler import Profiler
 
 def initialize(A_len, B_len):
     """Initializes an A_len x B_len matrix with empty Cells
@@ -196,114 +207,330 @@ def write_output(filename, output):
    with open(filename, 'w') as f:
       f.write(output)
 
-argument_list = sys.argv[1:]
-options = "hm:p:g:i:o:"
-long_options = ["help", "match_score", "mismatch_penalty", "gap_penalty", \
-                "input", "output"]
-
-# parse command line arguments
-try:
-   arguments, values = getopt.getopt(argument_list, options, long_options)
-   output_filename = ""
-   help_string = "-h, --help: displays this help menu\n\
-   -m, --match_score: the score of a match\n\
-   -p, --mismatch_penalty: the penalty to apply on a mismatch\n\
-   -g, --gap_penalty: the penalty to apply on a gap\n\
-   -i, --input: the input filename \n\
-   -o, --output: the filename of the output file. Running without this prints\
-      output to terminal"
-   for current_argument, current_value in arguments:
-      if current_argument in ("-h", "--help"):
-         print(help_string)
-         exit()
-      elif current_argument in ("-m", "--match_score"):
-         match_value = current_value
-      elif current_argument in ("-p", "--mismatch_penalty"):
-         mismatch_penalty = current_value
-      elif current_argument in ("-g", "--gap_penalty"):
-         gap_penalty = current_value
-      elif current_argument in ("-i", "--input"):
-         input_filename = current_value
-      elif current_argument in ("-o", "--output"):
-         output_filename = current_value
-except getopt.error as err:
-   print(str(err))
-
-# Input exception handling
-if match_value.lstrip("-").isnumeric():
-   match_value = float(match_value)
-else:
-   raise Exception("Match value must be numeric")
-if mismatch_penalty.lstrip("-").isnumeric():
-   mismatch_penalty = float(mismatch_penalty)
-else:
-   raise Exception("Mismatch penalty must be numeric")
-if gap_penalty.lstrip("-").isnumeric():
-   gap_penalty = float(gap_penalty)
-else:
-   raise Exception("Gap penalty must be numeric")
-
-# File extension formatting
-if output_filename[-4:] != ".txt":
-   raise Exception("Please specify the output file with the extension '.txt'")
-if input_filename[-4:] != ".txt":
-   raise Exception("Please specify the input file with the extension '.txt'")
-
-# read in sequences
-labels, sequences = read_file(input_filename)
-output = ""
-csv_rows = []
-# Pairwise comparison of each sequence
-for i in range(len(sequences)):
-   for j in range(i):
-      seq_a = sequences[i]
-      seq_b = sequences[j]
-      a_len = len(seq_a)
-      b_len = len(seq_b)
-      num_comparisons = 0
+def align(seq_a, seq_b, match_value, mismatch_penalty, gap_penalty, \
+          profiler=None):
+   """Aligns two sequences and finds their longest common substring
+   
+   Args:
+      seq_a (string): the first sequence we want to align
+      seq_b (string): the second sequence we want to align
+      match_value (float): the value we add when bases match
+      mismatch_penalty (float): the value we add when bases mismatch
+      gap_penalty (float): the value we add when inserting a gap
+      profiler (Profiler): records the compute and traceback phases
+   
+   Returns:
+      result (dict): aligned_seq_a, aligned_seq_b, lcs and num_comparisons
+         (the number of comparisons made, used for stats)
+   """
+   if profiler is None:
+      profiler = Profiler(enabled = False)
+   a_len = len(seq_a)
+   b_len = len(seq_b)
+   num_comparisons = 0
+   with profiler.phase("compute"):
       # Create the empty dynamic programming matrix
       mat = initialize(a_len, b_len)
       
       # Populate each cell in the matrix
       for n in range(1, a_len + 1):
          for m in range(1, b_len + 1):
-            mat[n][m], comparisons = get_max(n, m, seq_a, seq_b, mat, match_value, \
-                                mismatch_penalty, gap_penalty)
+            mat[n][m], comparisons = get_max(n, m, seq_a, seq_b, mat, \
+                                             match_value, mismatch_penalty, \
+                                             gap_penalty)
             num_comparisons += comparisons
 
+   with profiler.phase("traceback"):
       # Create aligned sequences through backtracing
-      aligned_seq_a, aligned_seq_b, comparisons = backtrace(seq_a, seq_b, mat)
+      aligned_seq_a, aligned_seq_b, comparisons = backtrace(seq_a, seq_b, \
+                                                            mat)
       num_comparisons += comparisons
 
       # Find LCS
       lcs, comparisons = get_LCS(aligned_seq_a, aligned_seq_b)
       num_comparisons += comparisons
+   profiler.count("pairs")
+   profiler.count("cells", a_len * b_len)
+   profiler.count("num_comparisons", num_comparisons)
+
+   return {"aligned_seq_a": aligned_seq_a,
+           "aligned_seq_b": aligned_seq_b,
+           "lcs": lcs,
+           "num_comparisons": num_comparisons}
 
-      # Format outputs
-      output += labels[i] + " =  " + seq_a + "\n"\
-                  + labels[j] + " = " + seq_b + "\n"\
-                  + "Aligned " + labels[i] +": " + aligned_seq_a + "\n"\
-                  + "Aligned " + labels[j] +": " + aligned_seq_b + "\n"\
-                  + "LCS: " + lcs + "\n"\
+def align_all(labels, sequences, match_value, mismatch_penalty, gap_penalty, \
+              profiler=None, cache=None, kmer_threshold=None, kmer_size=8):
+   """Pairwise alignment of every sequence against every earlier one
+   
+   Identical sequences are found before the pair loop, so each distinct 
+   (seq_a, seq_b) pair is aligned once however many labels share it. With a
+   cache, pairs aligned by earlier runs are not aligned again. With a 
+   kmer_threshold, pairs whose k-mer similarity (see Kmer.py) is below it 
+   are skipped rather than aligned; pairs with a sequence shorter than 
+   kmer_size have no estimate and are always aligned. A skipped pair's 
+   similarity may be an upper bound (still below kmer_threshold) rather than
+   its exact value.
+   
+   Args:
+      labels (string list): the names of the sequences to compare
+      sequences (string list): the sequences to compare
+      match_value (float): the value we add when bases match
+      mismatch_penalty (float): the value we add when bases mismatch
+      gap_penalty (float): the value we add when inserting a gap
+      profiler (Profiler): records the compute and traceback phases
+      cache (ResultCache): persistent results of earlier runs
+      kmer_threshold (float): the lowest k-mer similarity to align, 0 to 1.
+         No prefilter if None
+      kmer_size (int): the length of the k-mers used by the prefilter
+   
+   Returns:
+      results (dict list): one result of align per pair, in the order 
+         (1, 0), (2, 0), (2, 1), ..., also holding the pair's label_a, 
+         label_b, seq_a and seq_b. With the prefilter, every result has its
+         kmer_similarity, and skipped pairs hold only that and skipped = True
+   """
+   if profiler is None:
+      profiler = Profiler(enabled = False)
+   # give every distinct sequence an id
+   ids = {}
+   seq_ids = [ids.setdefault(sequence, len(ids)) for sequence in sequences]
+   aligned = {}
+   if kmer_threshold is not None:
+      with profiler.phase("prefilter"):
+         similarity, sizes = similarities(list(ids), kmer_size, \
+                                          kmer_threshold)
+
+   results = []
+   for i in range(len(sequences)):
+      for j in range(i):
+         pair = (seq_ids[i], seq_ids[j])
+         if kmer_threshold is not None:
+            if pair[0] == pair[1]:
+               estimate = 1.0
+            else:
+               estimate = similarity.get((max(pair), min(pair)), 0.0)
+            if estimate < kmer_threshold and sizes[pair[0]] and \
+               sizes[pair[1]]:
+               profiler.count("skipped_pairs")
+               results.append({"skipped": True, "kmer_similarity": estimate, \
+                               "label_a": labels[i], "label_b": labels[j], \
+                               "seq_a": sequences[i], "seq_b": sequences[j]})
+               continue
+         if pair in aligned:
+            profiler.count("duplicate_pairs")
+         elif cache is not None:
+            key = cache.key(sequences[i], sequences[j], match_value, \
+                            mismatch_penalty, gap_penalty)
+            aligned[pair] = cache.get(key)
+            if aligned[pair] is None:
+               aligned[pair] = align(sequences[i], sequences[j], \
+                                     match_value, mismatch_penalty, \
+                                     gap_penalty, profiler)
+               cache.put(key, aligned[pair])
+            else:
+               profiler.count("cache_hits")
+         else:
+            aligned[pair] = align(sequences[i], sequences[j], match_value, \
+                                  mismatch_penalty, gap_penalty, profiler)
+         result = dict(aligned[pair])
+         result.update({"label_a": labels[i], "label_b": labels[j], \
+                        "seq_a": sequences[i], "seq_b": sequences[j]})
+         if kmer_threshold is not None:
+            result["kmer_similarity"] = estimate
+         results.append(result)
+   return results
+
+def output_string(results):
+   """Formats the aligned sequences, LCS, and stats for printing
+   
+   Args:
+      results (dict list): the output of align_all
+   
+   Returns:
+      output (string): the formatted results
+   """
+   output = []
+   for result in results:
+      seq_a = result["seq_a"]
+      seq_b = result["seq_b"]
+      if result.get("skipped"):
+         output.append(result["label_a"] + " =  " + seq_a + "\n"\
+                     + result["label_b"] + " = " + seq_b + "\n"\
+                     + "Skipped, k-mer similarity: " + \
+                     str(result["kmer_similarity"]) + "\n\n")
+         continue
+      num_comparisons = result["num_comparisons"]
+      avg_seq_len = (len(seq_a) + len(seq_b))/2
+      output.append(result["label_a"] + " =  " + seq_a + "\n"\
+                  + result["label_b"] + " = " + seq_b + "\n"\
+                  + "Aligned " + result["label_a"] + ": " + \
+                     result["aligned_seq_a"] + "\n"\
+                  + "Aligned " + result["label_b"] + ": " + \
+                     result["aligned_seq_b"] + "\n"\
+                  + "LCS: " + result["lcs"] + "\n"\
                   + "Number of comparisons: " + str(num_comparisons) + "\n"\
-                  + "Average sequence length: " + \
-                     str((len(seq_a) + len(seq_b))/2) + "\n"\
+                  + "Average sequence length: " + str(avg_seq_len) + "\n"\
                   + "Number of comparisons / Average sequence length: " + \
-                  str(num_comparisons/((len(seq_a) + len(seq_b))/2)) + "\n\n"
-      
-      # Prep CSV output
-      csv_rows.append([num_comparisons, len(seq_a) * len(seq_b), (len(seq_a) + len(seq_b))/2, \
-                       num_comparisons/((len(seq_a) + len(seq_b))/2), lcs])
+                  str(num_comparisons/avg_seq_len) + "\n\n")
+   return "".join(output)
+
+def write_summary(filename, results):
+   """Writes the stats of each pair to a CSV file
+   
+   When the k-mer prefilter was used, two columns are added: the pair's 
+   kmer_similarity and whether it was skipped (skipped pairs have no 
+   comparisons and an empty LCS)
+   
+   Args:
+      filename (string): the file to write to (overwrites the file)
+      results (dict list): the output of align_all
+   """
+   prefiltered = any("kmer_similarity" in result for result in results)
+   with open(filename, 'w', newline="", encoding='UTF8') as f:
+      writer = csv.writer(f)
+
+      # write the header
+      header = ["num_comparisons", "num_bases", "avg_seq_len", \
+                "comp_per_seq_len", "LCS"]
+      if prefiltered:
+         header += ["kmer_similarity", "skipped"]
+      writer.writerow(header)
+
+      # write the data
+      for result in results:
+         a_len = len(result["seq_a"])
+         b_len = len(result["seq_b"])
+         num_comparisons = result.get("num_comparisons", 0)
+         row = [num_comparisons, a_len * b_len, (a_len + b_len)/2, \
+                num_comparisons/((a_len + b_len)/2), result.get("lcs", "")]
+         if prefiltered:
+            row += [result.get("kmer_similarity", ""), \
+                    int(result.get("skipped", False))]
+         writer.writerow(row)
+
+def main(argv=None):
+   """Command line entry point
+   
+   Aligns every pair of sequences in the input file, writing the alignments
+   to the output file and the stats to summary.csv
+   
+   Args:
+      argv (string list): the command line arguments, sys.argv[1:] if None
+   """
+   argument_list = sys.argv[1:] if argv is None else argv
+   options = "hm:p:g:i:o:"
+   long_options = ["help", "match_score", "mismatch_penalty", "gap_penalty", \
+                   "input", "output", "profile=", "cprofile=", \
+                   "trace_memory", "cache=", "cache_size=", \
+                   "kmer_threshold=", "kmer_size="]
+
+   # parse command line arguments
+   try:
+      arguments, values = getopt.getopt(argument_list, options, long_options)
+      output_filename = ""
+      profile_filename = ""
+      cprofile_filename = None
+      trace_memory = 0
+      cache_directory = ""
+      cache_size = 100
+      kmer_threshold = None
+      kmer_size = 8
+      help_string = "-h, --help: displays this help menu\n\
+   -m, --match_score: the score of a match\n\
+   -p, --mismatch_penalty: the penalty to apply on a mismatch\n\
+   -g, --gap_penalty: the penalty to apply on a gap\n\
+   -i, --input: the input filename \n\
+   -o, --output: the filename of the output file. Running without this prints\
+      output to terminal\n\
+   --profile: the JSON file to write phase timings, peak memory and \
+counters to\n\
+   --cprofile: the file to write a cProfile dump to (requires --profile)\n\
+   --trace_memory: also trace the peak memory allocated by Python (slows the \
+run down, do not compare its phase times with untraced runs)\n\
+   --cache: a directory to keep alignments in between runs\n\
+   --cache_size: the most megabytes the cache may use (default 100)\n\
+   --kmer_threshold: skip pairs whose k-mer similarity is below this (0 to 1)\n\
+   --kmer_size: the k-mer length for --kmer_threshold (default 8)"
+      for current_argument, current_value in arguments:
+         if current_argument in ("-h", "--help"):
+            print(help_string)
+            return
+         elif current_argument in ("-m", "--match_score"):
+            match_value = current_value
+         elif current_argument in ("-p", "--mismatch_penalty"):
+            mismatch_penalty = current_value
+         elif current_argument in ("-g", "--gap_penalty"):
+            gap_penalty = current_value
+         elif current_argument in ("-i", "--input"):
+            input_filename = current_value
+         elif current_argument in ("-o", "--output"):
+            output_filename = current_value
+         elif current_argument == "--profile":
+            profile_filename = current_value
+         elif current_argument == "--cprofile":
+            cprofile_filename = current_value
+         elif current_argument == "--trace_memory":
+            trace_memory = 1
+         elif current_argument == "--cache":
+            cache_directory = current_value
+         elif current_argument == "--cache_size":
+            cache_size = float(current_value)
+         elif current_argument == "--kmer_threshold":
+            kmer_threshold = float(current_value)
+         elif current_argument == "--kmer_size":
+            kmer_size = int(current_value)
+   except getopt.error as err:
+      print(str(err))
+
+   # Input exception handling
+   if match_value.lstrip("-").isnumeric():
+      match_value = float(match_value)
+   else:
+      raise Exception("Match value must be numeric")
+   if mismatch_penalty.lstrip("-").isnumeric():
+      mismatch_penalty = float(mismatch_penalty)
+   else:
+      raise Exception("Mismatch penalty must be numeric")
+   if gap_penalty.lstrip("-").isnumeric():
+      gap_penalty = float(gap_penalty)
+   else:
+      raise Exception("Gap penalty must be numeric")
+
+   if kmer_size < 1:
+      raise Exception("k-mer size must be at least 1")
+   if kmer_threshold is not None and not 0 <= kmer_threshold <= 1:
+      raise Exception("k-mer threshold must be between 0 and 1")
+
+   # File extension formatting
+   if output_filename[-4:] != ".txt":
+      raise Exception("Please specify the output file with the extension \
+'.txt'")
+   if input_filename[-4:] != ".txt":
+      raise Exception("Please specify the input file with the extension \
+'.txt'")
 
-# Write stats to CSV
-with open('summary.csv', 'w', newline="", encoding='UTF8') as f:
-    writer = csv.writer(f)
+   profiler = Profiler("alignment", bool(profile_filename), cprofile_filename, \
+                       bool(trace_memory))
+   profiler.start()
+   # read in sequences and compare each pair
+   with profiler.phase("parse"):
+      labels, sequences = read_file(input_filename)
+   cache = None
+   if cache_directory:
+      cache = ResultCache(cache_directory, int(cache_size * 2**20))
+   results = align_all(labels, sequences, match_value, mismatch_penalty, \
+                       gap_penalty, profiler, cache, kmer_threshold, kmer_size)
+   with profiler.phase("format"):
+      output = output_string(results)
 
-    # write the header
-    writer.writerow(["num_comparisons", "num_bases", "avg_seq_len", "comp_per_seq_len", "LCS"])
+   with profiler.phase("write"):
+      # Write stats to CSV
+      write_summary('summary.csv', results)
+      # Write aligned sequences, LCS, and stats to .txt
+      write_output(output_filename, output)
+   profiler.stop()
+   if profile_filename:
+      profiler.write(profile_filename)
 
-    # write the data
-    for row in csv_rows:
-      writer.writerow(row)
-# Write aligned sequences, LCS, and stats to .txt
-write_output(output_filename, output)
\ No newline at end of file
+if __name__ == "__main__":
+   main()
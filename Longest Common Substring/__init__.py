@@ -0,0 +1,11 @@
+"""
+Pairwise sequence alignment and longest common substring (see Project.py).
+
+Importing the package has no side effects; the command line is available as
+main(). The directory name has spaces, so import it with
+importlib.import_module("Longest Common Substring").
+"""
+from .Project import align, align_all, output_string, write_summary, \
+   read_file, main
+from .Cache import ResultCache
+from .Kmer import similarities
@@ -1,6 +1,11 @@
-import time
+import getopt, sys, os, queue, random, threading, time
 from math import ceil, log
+from concurrent.futures import ProcessPoolExecutor
 import csv
+if not __package__:
+   # run as a script, Profiler.py is in the repo root one level up
+   sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from Profiler import Profiler
 """
    This program serves to show the difference in runtimes between
       Naive Matrix Multiplication and Strassen's Algorithm for
@@ -16,6 +21,17 @@ import csv
       2 (order of next square matrix)
    Run calls 'get_results' which times and calculates the naive
       and Strassen multiplication and reports them back.
+   From the command line, main writes the results of both methods:
+      python Lab1.py -i LabStrassenInput.txt -n NaiveResults_Required.txt
+         -s StrassenResults_Required.txt -r runtimes.csv
+   or, for files of many small matrices, only the products, computed by
+      'batch_mult' (requires numpy):
+      python Lab1.py -i LabStrassenInput.txt -b Results.txt
+   Adding -v replaces the O(n^3) comparison against the naive method with
+      'freivalds', a randomized O(n^2) check of each product.
+   Adding -p runs 'pipeline' instead of 'run', which parses, multiplies (in
+      a pool of worker processes) and writes at the same time, through 
+      bounded queues.
 """
 
 def naive_mult(a, b):
@@ -127,20 +143,16 @@ def strassen(a, b):
     
    return res
 
-def get_results(a, b):
-   """ Calculates results and time for matrix multiplication
-    
-   Multiplies a and b using naive and Strassen's matrix multiplication
-    
+def pad(a, b):
+   """ Pads a pair of matrices for 'strassen'
+   
    Args:
       a (array): square matrix of length N
-      a (array): square matrix of length N
-        
+      b (array): square matrix of length N
+   
    Returns:
-      naive_res (matrix): array that has been multiplied by the naive method
-      strassen_res (matrix): array that has been multiplied by the Strassen 
-      method naive_runtime (float): runtimes for naive_res result
-      strassen_runtime (float): runtime for strassen_res result
+      strassen_a (array): a, padded with 0s to the next power of 2
+      strassen_b (array): b, padded with 0s to the next power of 2
    """
    n = 2**(int(ceil(log(len(a), 2))))
     
@@ -154,6 +166,61 @@ def get_results(a, b):
       for j in range(len(a)):
          strassen_a[i][j] = a[i][j]
          strassen_b[i][j] = b[i][j]
+   return strassen_a, strassen_b
+
+def strassen_padded(strassen_a, strassen_b, order):
+   """ Multiplies a pair from 'pad' and removes the padding
+   
+   Args:
+      strassen_a (array): square matrix whose length is a power of 2
+      strassen_b (array): square matrix whose length is a power of 2
+      order (int): the length N of the matrices before padding
+   
+   Returns:
+      C (array): square matrix of length N resulting from a x b
+   """
+   strassen_res = strassen(strassen_a, strassen_b)
+
+   # If we added 0s to pad up to power of 2, remove them, otherwise do 
+   #   nothing
+   if len(strassen_res) != order:
+      strassen_final = [[0 for _ in range(order)] for _ in range(order)]
+      for i in range(order):
+         for j in range(order):
+            strassen_final[i][j] = strassen_res[i][j]
+   else:
+      strassen_final = strassen_res
+   return strassen_final
+
+def strassen_mult(a, b):
+   """ Strassen multiplication of matrices of any order
+   
+   Args:
+      a (array): square matrix of length N
+      b (array): square matrix of length N
+   
+   Returns:
+      C (array): square matrix of length N resulting from a x b
+   """
+   strassen_a, strassen_b = pad(a, b)
+   return strassen_padded(strassen_a, strassen_b, len(a))
+
+def get_results(a, b):
+   """ Calculates results and time for matrix multiplication
+    
+   Multiplies a and b using naive and Strassen's matrix multiplication
+    
+   Args:
+      a (array): square matrix of length N
+      a (array): square matrix of length N
+        
+   Returns:
+      naive_res (matrix): array that has been multiplied by the naive method
+      strassen_res (matrix): array that has been multiplied by the Strassen 
+      method naive_runtime (float): runtimes for naive_res result
+      strassen_runtime (float): runtime for strassen_res result
+   """
+   strassen_a, strassen_b = pad(a, b)
 
    # Time naive_mult with 'begin' and 'middle' timepoints
    begin = time.perf_counter()
@@ -163,30 +230,157 @@ def get_results(a, b):
    naive_runtime = middle - begin
     
     
-   strassen_res = strassen(strassen_a, strassen_b)
-
-   # If we added 0s to pad up to power of 2, remove them, otherwise do 
-   #   nothing
-   if n != len(a):
-      strassen_final = [[0 for _ in range(len(a))] for _ in range(len(a))]
-      for i in range(len(a)):
-         for j in range(len(a)):
-            strassen_final[i][j] = strassen_res[i][j]
-   else:
-      strassen_final = strassen_res
+   strassen_final = strassen_padded(strassen_a, strassen_b, len(a))
 
    # Time strassen with 'middle' and 'end' timepoints
    strassen_runtime = time.perf_counter() - middle
 
    return (naive_res, strassen_final, naive_runtime, strassen_runtime)
 
-def run(path):
+def freivalds(a, b, c, rounds=10, rng=None):
+   """ Freivalds' probabilistic check that c = a x b
+   
+   Each round picks a random 0/1 vector r and compares a(br) with cr, which
+   takes O(n^2) instead of the O(n^3) of recomputing the product. A correct
+   c always passes; a wrong c passes a round with probability at most 1/2,
+   so it survives every round with probability at most 2^-rounds.
+   
+   Args:
+      a (matrix): square matrix of length N
+      b (matrix): square matrix of length N
+      c (matrix): the claimed product of a x b
+      rounds (int): the number of random vectors to try
+      rng (Random): the source of random vectors, seed it for reproducible
+         checks. A new unseeded generator if None
+   
+   Returns:
+      (int): 1 if c passed every round, otherwise 0 (as in 'identical')
+   """
+   if rng is None:
+      rng = random.Random()
+   n = len(a)
+   for _ in range(rounds):
+      r = [rng.getrandbits(1) for _ in range(n)]
+      br = [sum(row[j] * r[j] for j in range(n)) for row in b]
+      abr = [sum(row[j] * br[j] for j in range(n)) for row in a]
+      cr = [sum(row[j] * r[j] for j in range(n)) for row in c]
+      if abr != cr:
+         return 0
+   return 1
+
+def batch_mult(pairs):
+   """ Multiplies many matrix pairs with one NumPy call per order
+   
+   Pairs of the same order are stacked into (k, n, n) arrays and multiplied
+   with a single matmul, which removes the per-pair Python overhead of 
+   naive_mult and strassen for workloads of many small matrices. A group
+   is multiplied in 64 bit integers when no sum of products can overflow,
+   n * max|a| * max|b| < 2^63, and as Python integers (NumPy object 
+   arrays, much slower but exact) otherwise.
+   
+   Args:
+      pairs (list): (a, b) square matrix pairs of identical order
+   
+   Returns:
+      products (list): the product of each pair, in input order
+   """
+   try:
+      import numpy as np
+   except ImportError:
+      raise Exception("batch multiplication requires numpy (pip install numpy)")
+
+   # group the pairs by order, remembering where each came from
+   groups = {}
+   for index, (a, b) in enumerate(pairs):
+      if not len(a) == len(b):
+         raise Exception("A and B must be identically ordered")
+      groups.setdefault(len(a), []).append(index)
+
+   products = [None] * len(pairs)
+   for n, indices in groups.items():
+      max_a = max((abs(x) for i in indices for row in pairs[i][0] \
+                    for x in row), default=0)
+      max_b = max((abs(x) for i in indices for row in pairs[i][1] \
+                    for x in row), default=0)
+      dtype = np.int64 if n * max_a * max_b < 2**63 else object
+      a = np.array([pairs[i][0] for i in indices], dtype=dtype)
+      b = np.array([pairs[i][1] for i in indices], dtype=dtype)
+      for i, product in zip(indices, np.matmul(a, b).tolist()):
+         products[i] = product
+   return products
+
+def read_pairs(path):
+   """ Reads matrix pairs from an input file
+   
+   Args:
+      path (string): the path to the input file
+   
+   Yields:
+      size (string): the order line of the pair, as written in the file
+      a (matrix): the first matrix of the pair
+      b (matrix): the second matrix of the pair
+   """
+   with open(path, 'r') as file:
+      while True:    
+         # Get next line from file
+         line = file.readline().strip()
+         # If empty, exit loop
+         if not line:
+            break
+         size = line
+         # If we don't exit, must cast string to int
+         line = int(line)
+
+         a = []
+         b = []
+
+         # Read through next lines, creating parameter arrays
+         for i in range(line):
+            a.append([int(num) for num in file.readline().strip().split()])
+         for i in range(line):
+            b.append([int(num) for num in file.readline().strip().split()])
+
+         # Check for valid shape (square)
+         if not (all (len (row) == len (a) for row in a) or 
+            all (len (row) == len (a) for row in a)):
+            raise Exception("A and B must be square matrices")
+         
+         # Check for identical order
+         if not len(a) == len(b):
+            raise Exception("A and B must be identically ordered")
+
+         yield size, a, b
+
+         # Read line to skip empty line between examples
+         file.readline()
+
+def multiply_pairs(pairs):
+   """ Multiplies matrix pairs that are already in memory
+   
+   Args:
+      pairs (list): (a, b) square matrix pairs of identical order
+   
+   Returns:
+      results (dict list): for each pair, in order, the naive_res, 
+         strassen_res, naive_runtime and strassen_runtime from get_results
+   """
+   results = []
+   for a, b in pairs:
+      if not len(a) == len(b):
+         raise Exception("A and B must be identically ordered")
+      w, x, y, z = get_results(a, b)
+      results.append({"naive_res": w, "strassen_res": x, \
+                      "naive_runtime": y, "strassen_runtime": z})
+   return results
+
+def run(path, profiler=None):
    """ Driver function
     
    Controls the running of this program.
     
    Args:
       path (string): the path to the input file
+      profiler (Profiler): records the parse and compute phases
     
    Returns:
       naive_res (list): list of arrays that have been multiplied by the 
@@ -195,59 +389,151 @@ def run(path):
          Strassen method
       naive_runtime (list): list of runtimes for naive_res results
       strassen_runtime (list): list of runtimes for strassen_res results
+      sizes (list): the order of each pair, as written in the file
    """
-
-   # Open file and define return lists
-   file = open(path, 'r')
    naive_res = []
    strassen_res = []
    naive_runtime = []
    strassen_runtime = []
    sizes = []
+   if profiler is None:
+      profiler = Profiler(enabled = False)
 
-   while True:    
-      # Get next line from file
-      line = file.readline().strip()
-      # If empty, exit loop
-      if not line:
-         break
-      sizes.append(line)
-      # If we don't exit, must cast string to int
-      line = int(line)
-
-      a = []
-      b = []
-
-        
-      # Read through next lines, creating parameter arrays
-      for i in range(line):
-         a.append([int(num) for num in file.readline().strip().split()])
-      for i in range(line):
-         b.append([int(num) for num in file.readline().strip().split()])
-
-      # Check for valid shape (square)
-      if not (all (len (row) == len (a) for row in a) or 
-         all (len (row) == len (a) for row in a)):
-         raise Exception("A and B must be square matrices")
-      
-      # Check for identical order
-      if not len(a) == len(b):
-         raise Exception("A and B must be identically ordered")
-      
-      w, x, y, z = get_results(a, b)
+   for size, a, b in profiler.timed("parse", read_pairs(path)):
+      sizes.append(size)
+      with profiler.phase("compute"):
+         w, x, y, z = get_results(a, b)
+      profiler.count("pairs")
       naive_res.append(w)
       strassen_res.append(x)
       naive_runtime.append(y)
       strassen_runtime.append(z)
-
-        
-
-      # Read line to skip empty line between examples
-      file.readline()
-   file.close()
     
    return (naive_res, strassen_res, naive_runtime, strassen_runtime, sizes)
 
+def produce(items, out):
+   """ Pipeline stage that feeds items into a bounded queue
+   
+   Runs in its own thread. put() blocks while the queue is full, so the 
+   stage never gets more than the queue's maxsize items ahead. An exception
+   is passed along in place of the next item, and None marks the end.
+   
+   Args:
+      items (iterable): the items to feed, e.g. read_pairs(path)
+      out (Queue): the queue to feed them into
+   """
+   try:
+      for item in items:
+         out.put(item)
+   except Exception as err:
+      out.put(err)
+      return
+   out.put(None)
+
+def consume(source):
+   """ Takes the items fed by 'produce' until the end marker
+   
+   Args:
+      source (Queue): the queue filled by 'produce'
+   
+   Yields:
+      item: the next item, in order
+   
+   Raises:
+      Exception: the exception raised by the producing stage, if any
+   """
+   while True:
+      item = source.get()
+      if item is None:
+         return
+      if isinstance(item, Exception):
+         raise item
+      yield item
+
+def pipeline(path, naive_filename, strassen_filename, runtimes_filename="", \
+             workers=None, depth=None, profiler=None):
+   """ Pipelined driver
+   
+   Does the work of 'run' and 'print_matrices' with parsing, multiplying 
+   and writing overlapped:
+      parse: a thread reads pairs with 'read_pairs' into a bounded queue
+      compute: a thread hands each pair to a pool of worker processes 
+         running 'get_results' (processes, as the multiplication is pure 
+         Python and threads would share the GIL) and queues the pending 
+         result, again bounded
+      write: the caller's thread waits on each result in submission order,
+         so the output matches the input order, and writes it immediately
+   At most depth pairs are parsed ahead and depth results are in flight, so
+   memory is bounded by the queue depth instead of the number of pairs.
+   
+   Args:
+      path (string): the path to the input file
+      naive_filename (string): the file for naive results, as written by
+         'print_matrices'
+      strassen_filename (string): the file for Strassen results
+      runtimes_filename (string): the CSV file for runtimes, as written by
+         'write_runtimes' (optional)
+      workers (int): the number of worker processes, one per CPU if None
+      depth (int): the size of each queue, 2 * workers if None
+      profiler (Profiler): records the write phase and counts the pairs
+   
+   Returns:
+      count (int): the number of Strassen results matching the naive ones
+      total (int): the number of pairs
+   """
+   if profiler is None:
+      profiler = Profiler(enabled = False)
+   workers = workers or os.cpu_count() or 1
+   depth = depth or 2 * workers
+   pairs = queue.Queue(maxsize=depth)
+   results = queue.Queue(maxsize=depth)
+   naive_file = open(naive_filename, 'w')
+   strassen_file = open(strassen_filename, 'w')
+   runtimes_file = None
+   writer = None
+   if runtimes_filename:
+      runtimes_file = open(runtimes_filename, 'w', newline="")
+      writer = csv.writer(runtimes_file)
+      writer.writerow(["size", "naive_runtime", "strassen_runtime"])
+
+   with ProcessPoolExecutor(max_workers=workers) as pool:
+      def submit():
+         produce(((size, pool.submit(get_results, a, b)) \
+                  for size, a, b in consume(pairs)), results)
+      # daemon threads, so a failed run does not hang on a full queue
+      threading.Thread(target=produce, args=(read_pairs(path), pairs), \
+                       daemon=True).start()
+      threading.Thread(target=submit, daemon=True).start()
+
+      count = 0
+      total = 0
+      try:
+         for size, future in consume(results):
+            naive_res, strassen_res, naive_runtime, strassen_runtime = \
+               future.result()
+            with profiler.phase("write"):
+               # blank line between matrices, as in 'print_matrices'
+               if total:
+                  naive_file.write('\n')
+                  strassen_file.write('\n')
+               for row in naive_res:
+                  naive_file.write(' '.join(str(elem) for elem in row) + '\n')
+               for row in strassen_res:
+                  strassen_file.write(' '.join(str(elem) for elem in row) \
+                                      + '\n')
+               if writer:
+                  writer.writerow([size, naive_runtime, strassen_runtime])
+            count += identical(naive_res, strassen_res)
+            total += 1
+            profiler.count("pairs")
+      finally:
+         pool.shutdown(cancel_futures=True)
+         naive_file.close()
+         strassen_file.close()
+         if runtimes_file:
+            runtimes_file.close()
+   return count, total
+
 def print_matrices(a, file_name):
    """ Pretty prints matrices
    
@@ -267,19 +553,217 @@ def print_matrices(a, file_name):
                 f.write('\n')
 
 def identical(a, b):
+   """ Checks whether two matrices are equal element by element
+   
+   Args:
+      a (matrix): square matrix of length N
+      b (matrix): square matrix of length N
+   
+   Returns:
+      (int): 1 if every element matches, otherwise 0
+   """
    for i in range(len(a)):
       for j in range(len(a)):
          if a[i][j] != b[i][j]:
             return 0
    return 1
-#file_name = "./LabStrassenInput.txt"
-#file_name = "./test_examples.txt"
-#file_name = "./wrong_example.txt"
-#naive_res, strassen_res, naive_runtime, strassen_runtime, sizes = run(file_name)
-#count = 0
-#for i in range(len(naive_res)):
-#   count += identical(naive_res[i], strassen_res[i])
-#with open("Num_Correct.txt", 'w') as f:
-#   f.write(str(count) + "/" + str(len(naive_res)))
-# print_matrices(naive_res, "NaiveResults_Required.txt")
-# print_matrices(strassen_res, "StrassenResults_Required.txt")
+
+def write_runtimes(sizes, naive_runtime, strassen_runtime, file_name):
+   """ Writes the runtime of each method for each pair to a CSV file
+   
+   Args:
+      sizes (list): the order of each pair
+      naive_runtime (list): list of runtimes for naive results
+      strassen_runtime (list): list of runtimes for Strassen results
+      file_name (string): the name of the file, extension required
+   """
+   with open(file_name, 'w', newline="") as f:
+      writer = csv.writer(f)
+      writer.writerow(["size", "naive_runtime", "strassen_runtime"])
+      for row in zip(sizes, naive_runtime, strassen_runtime):
+         writer.writerow(row)
+
+def main(argv=None):
+   """ Command line entry point
+   
+   Multiplies every pair in the input file with both methods and writes the
+   results, the number of Strassen results matching the naive ones, and 
+   optionally the runtimes.
+   
+   Args:
+      argv (string list): the command line arguments, sys.argv[1:] if None
+   """
+   argument_list = sys.argv[1:] if argv is None else argv
+   options = "hi:n:s:c:r:b:vpw:"
+   long_options = ["help", "input=", "naive_output=", "strassen_output=", \
+                   "correct_output=", "runtimes=", "batch=", "verify", \
+                   "rounds=", "seed=", "pipeline", "workers=", "depth=", \
+                   "profile=", "cprofile=", "trace_memory"]
+   input_filename = ""
+   naive_filename = ""
+   strassen_filename = "StrassenResults.txt"
+   correct_filename = "Num_Correct.txt"
+   runtimes_filename = ""
+   batch_filename = ""
+   verify = 0
+   rounds = 10
+   seed = 0
+   pipelined = 0
+   workers = None
+   depth = None
+   profile_filename = ""
+   cprofile_filename = None
+   trace_memory = 0
+
+   # parse command line arguments
+   try:
+      arguments, values = getopt.getopt(argument_list, options, long_options)
+      help_string = "-i, --input: the input filename\n\
+-n, --naive_output: the file for naive results (default NaiveResults.txt)\n\
+-s, --strassen_output: the file for Strassen results \
+(default StrassenResults.txt)\n\
+-c, --correct_output: the file for the number of matching results \
+(default Num_Correct.txt)\n\
+-r, --runtimes: the CSV file for the runtimes of each pair (optional)\n\
+-b, --batch: multiply with batched NumPy calls instead, writing only the \
+products to this file\n\
+-v, --verify: skip the naive method and check each product with Freivalds' \
+algorithm, writing the number that pass to the -c file (not with -n or -r)\n\
+--rounds: the number of Freivalds rounds per product (default 10)\n\
+--seed: the seed for Freivalds' random vectors (default 0)\n\
+-p, --pipeline: overlap parsing, multiplying (in worker processes) and \
+writing, keeping only a few pairs in memory\n\
+-w, --workers: the number of worker processes for -p \
+(default: number of CPUs)\n\
+--depth: the queue size between -p stages (default 2 * workers)\n\
+--profile: the JSON file to write phase timings, peak memory and counters to\n\
+--cprofile: the file to write a cProfile dump to (requires --profile)\n\
+--trace_memory: also trace the peak memory allocated by Python (slows the \
+run down, do not compare its phase times with untraced runs)"
+      for current_argument, current_value in arguments:
+         if current_argument in ("-h", "--help"):
+            print(help_string)
+            return
+         elif current_argument in ("-i", "--input"):
+            input_filename = current_value
+         elif current_argument in ("-n", "--naive_output"):
+            naive_filename = current_value
+         elif current_argument in ("-s", "--strassen_output"):
+            strassen_filename = current_value
+         elif current_argument in ("-c", "--correct_output"):
+            correct_filename = current_value
+         elif current_argument in ("-r", "--runtimes"):
+            runtimes_filename = current_value
+         elif current_argument in ("-b", "--batch"):
+            batch_filename = current_value
+         elif current_argument in ("-v", "--verify"):
+            verify = 1
+         elif current_argument == "--rounds":
+            rounds = int(current_value)
+         elif current_argument == "--seed":
+            seed = int(current_value)
+         elif current_argument in ("-p", "--pipeline"):
+            pipelined = 1
+         elif current_argument in ("-w", "--workers"):
+            workers = int(current_value)
+         elif current_argument == "--depth":
+            depth = int(current_value)
+         elif current_argument == "--profile":
+            profile_filename = current_value
+         elif current_argument == "--cprofile":
+            cprofile_filename = current_value
+         elif current_argument == "--trace_memory":
+            trace_memory = 1
+   except getopt.error as err:
+      print(str(err))
+
+   if not input_filename:
+      raise Exception("Please specify the input file with -i")
+   if rounds < 1:
+      raise Exception("rounds must be at least 1")
+   if pipelined and (batch_filename or verify):
+      raise Exception("-p cannot be combined with -b or -v")
+   if verify and (naive_filename or runtimes_filename):
+      raise Exception("-v skips the naive method, so it cannot be combined \
+with -n or -r")
+   naive_filename = naive_filename or "NaiveResults.txt"
+   if (workers is not None and workers < 1) or \
+      (depth is not None and depth < 1):
+      raise Exception("workers and depth must be at least 1")
+   rng = random.Random(seed)
+
+   profiler = Profiler("strassen", bool(profile_filename), cprofile_filename, \
+                       bool(trace_memory))
+   profiler.start()
+   if batch_filename:
+      with profiler.phase("parse"):
+         pairs = [(a, b) for size, a, b in read_pairs(input_filename)]
+      with profiler.phase("compute"):
+         products = batch_mult(pairs)
+      profiler.count("pairs", len(pairs))
+      if verify:
+         with profiler.phase("verify"):
+            count = 0
+            for (a, b), product in zip(pairs, products):
+               count += freivalds(a, b, product, rounds, rng)
+      with profiler.phase("write"):
+         print_matrices(products, batch_filename)
+         if verify:
+            with open(correct_filename, 'w') as f:
+               f.write(str(count) + "/" + str(len(products)))
+      profiler.stop()
+      if profile_filename:
+         profiler.write(profile_filename)
+      return
+
+   if verify:
+      # Strassen only, checked in O(rounds * n^2) per product
+      strassen_res = []
+      count = 0
+      for size, a, b in profiler.timed("parse", read_pairs(input_filename)):
+         with profiler.phase("compute"):
+            product = strassen_mult(a, b)
+         with profiler.phase("verify"):
+            count += freivalds(a, b, product, rounds, rng)
+         strassen_res.append(product)
+         profiler.count("pairs")
+      with profiler.phase("write"):
+         with open(correct_filename, 'w') as f:
+            f.write(str(count) + "/" + str(len(strassen_res)))
+         print_matrices(strassen_res, strassen_filename)
+      profiler.stop()
+      if profile_filename:
+         profiler.write(profile_filename)
+      return
+
+   if pipelined:
+      count, total = pipeline(input_filename, naive_filename, \
+                              strassen_filename, runtimes_filename, workers, \
+                              depth, profiler)
+      with open(correct_filename, 'w') as f:
+         f.write(str(count) + "/" + str(total))
+      profiler.stop()
+      if profile_filename:
+         profiler.write(profile_filename)
+      return
+
+   naive_res, strassen_res, naive_runtime, strassen_runtime, sizes = \
+      run(input_filename, profiler)
+   with profiler.phase("verify"):
+      count = 0
+      for i in range(len(naive_res)):
+         count += identical(naive_res[i], strassen_res[i])
+   with profiler.phase("write"):
+      with open(correct_filename, 'w') as f:
+         f.write(str(count) + "/" + str(len(naive_res)))
+      print_matrices(naive_res, naive_filename)
+      print_matrices(strassen_res, strassen_filename)
+      if runtimes_filename:
+         write_runtimes(sizes, naive_runtime, strassen_runtime, \
+                        runtimes_filename)
+   profiler.stop()
+   if profile_filename:
+      profiler.write(profile_filename)
+
+if __name__ == "__main__":
+   main()
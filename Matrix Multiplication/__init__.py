@@ -0,0 +1,10 @@
+"""
+Naive and Strassen matrix multiplication (see Lab1.py).
+
+Importing the package has no side effects; the command line is available as
+main(). The directory name has spaces, so import it with
+importlib.import_module("Matrix Multiplication").
+"""
+from .Lab1 import naive_mult, strassen, strassen_mult, get_results, \
+   freivalds, multiply_pairs, batch_mult, read_pairs, run, pipeline, \
+   print_matrices, identical, main
@@ -0,0 +1,190 @@
+import cProfile, json, sys, time, tracemalloc
+try:
+   import resource
+except ImportError:
+   resource = None
+"""
+Shared instrumentation for the Hashing, Longest Common Substring and Matrix
+Multiplication drivers.
+
+A Profiler records how long each phase of a run takes (parse, compute,
+probe/traceback, format, write), the peak resident set size of the process
+and any counters the driver reports, and writes them as JSON. Phases may
+nest; each phase is only charged for the time not spent in the phases
+inside it, so the phase times add up to the total. A cProfile dump of the
+run can be written alongside.
+
+Each driver enables it with --profile <file.json> (and --cprofile
+<file.prof> for the cProfile dump). The peak memory allocated by Python can
+also be traced with --trace_memory, but tracemalloc hooks every allocation
+and slows allocation heavy phases down many times over, so the phase times
+of a traced run should not be compared with those of an untraced one.
+
+A disabled Profiler records nothing and costs close to nothing, so engine
+functions can always call it.
+"""
+
+class Phase:
+   """Context manager that charges the time spent inside it to a phase"""
+   def __init__(self, profiler, name):
+      self.profiler = profiler
+      self.name = name
+
+   def __enter__(self):
+      self.profiler.enter(self.name)
+
+   def __exit__(self, *exc):
+      self.profiler.exit()
+
+class NoPhase:
+   """Context manager used when profiling is disabled"""
+   def __enter__(self):
+      pass
+
+   def __exit__(self, *exc):
+      pass
+
+NO_PHASE = NoPhase()
+
+class Profiler:
+   """Phase timer, memory high water mark and counters for one run
+
+   start() and stop() bracket the run, phase() and timed() charge time to
+   named phases, count() adds to counters, and write() saves results() as
+   JSON. With enabled False every method returns at once.
+
+   Args:
+      tool (string): the driver's name, recorded in the results
+      enabled (boolean): whether to record anything
+      cprofile_filename (string): where to dump a cProfile run (optional)
+      trace_memory (boolean): whether to trace Python allocations with
+         tracemalloc, which slows the run down
+   """
+   def __init__(self, tool = "", enabled = True, cprofile_filename = None, \
+                trace_memory = False):
+      self.tool = tool
+      self.enabled = enabled
+      self.cprofile_filename = cprofile_filename
+      self.trace_memory = trace_memory
+      self.phases = {}
+      self.counters = {}
+      # [name, start time, time spent in nested phases] of open phases
+      self.stack = []
+      self.profile = None
+      self.begin = None
+      self.total = 0
+      self.peak_rss = None
+      self.peak_traced = None
+
+   def start(self):
+      """Starts the clock, memory tracing and cProfile (if requested)"""
+      if not self.enabled:
+         return
+      if self.trace_memory:
+         tracemalloc.start()
+      if self.cprofile_filename:
+         self.profile = cProfile.Profile()
+         self.profile.enable()
+      self.begin = time.perf_counter()
+
+   def stop(self):
+      """Stops the run, recording the total time and peak memory"""
+      if not self.enabled or self.begin is None:
+         return
+      self.total = time.perf_counter() - self.begin
+      if self.profile is not None:
+         self.profile.disable()
+         self.profile.dump_stats(self.cprofile_filename)
+      if self.trace_memory:
+         self.peak_traced = tracemalloc.get_traced_memory()[1]
+         tracemalloc.stop()
+      if resource is not None:
+         # kilobytes on Linux, bytes on macOS
+         rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+         self.peak_rss = rss if sys.platform == "darwin" else rss * 1024
+
+   def enter(self, name):
+      self.stack.append([name, time.perf_counter(), 0.0])
+
+   def exit(self):
+      name, start, nested = self.stack.pop()
+      elapsed = time.perf_counter() - start
+      self.phases[name] = self.phases.get(name, 0.0) + elapsed - nested
+      if self.stack:
+         self.stack[-1][2] += elapsed
+
+   def phase(self, name):
+      """Times the code in a with block as part of the named phase
+
+      Args:
+         name (string): the phase to charge the time to
+
+      Returns:
+         (context manager): a Phase, or a no-op when disabled
+      """
+      if not self.enabled:
+         return NO_PHASE
+      return Phase(self, name)
+
+   def timed(self, name, iterable):
+      """Charges the time spent producing each item of iterable to a phase
+
+      Used for lazy parsing, where reading the input is interleaved with
+      the work done on each item
+
+      Args:
+         name (string): the phase to charge the time to
+         iterable (iterable): the items to pass through
+
+      Returns:
+         (iterable): the same items, in order
+      """
+      if not self.enabled:
+         return iterable
+      return self.timed_items(name, iter(iterable))
+
+   def timed_items(self, name, iterator):
+      while True:
+         self.enter(name)
+         try:
+            item = next(iterator)
+         except StopIteration:
+            return
+         finally:
+            self.exit()
+         yield item
+
+   def count(self, name, n = 1):
+      """Adds n to the named counter"""
+      if self.enabled:
+         self.counters[name] = self.counters.get(name, 0) + n
+
+   def results(self):
+      """Collects everything recorded into a JSON friendly dictionary
+
+      Returns:
+         results (dict): tool, total_seconds, phases (seconds per phase,
+            plus "other" for time outside every phase), peak_rss_bytes (the
+            high water mark of the whole process, None where the resource
+            module is missing), peak_traced_bytes (None unless
+            trace_memory), counters and the cprofile dump filename
+      """
+      phases = dict(self.phases)
+      phases["other"] = max(self.total - sum(self.phases.values()), 0.0)
+      return {"tool": self.tool,
+              "total_seconds": self.total,
+              "phases": phases,
+              "peak_rss_bytes": self.peak_rss,
+              "peak_traced_bytes": self.peak_traced,
+              "counters": self.counters,
+              "cprofile": self.cprofile_filename}
+
+   def write(self, filename):
+      """Writes the results as JSON
+
+      Args:
+         filename (string): the file to write to (overwrites the file)
+      """
+      with open(filename, 'w') as f:
+         json.dump(self.results(), f, indent = 3)
+         f.write("\n")